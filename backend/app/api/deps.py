@@ -1,55 +1,381 @@
-from collections.abc import Generator
-from typing import Annotated
+import hashlib
+import hmac
+import time
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Any, cast
 
 import jwt
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer, SecurityScopes
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app import crud
 from app.core import security
+from app.core.api_keys import api_key_usage
+from app.core.budgets import raising_budget_exceeded, set_statement_timeout
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import (
+    ThreadedSession,
+    async_engine,
+    engine,
+    replica_async_engines,
+    replica_engines,
+)
+from app.core.query_stats import current_query_stats
+from app.core.revocation import revocation_list
+from app.core.routing import RoutingSession, pick_replica, replica_pins
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
+# Same scheme, for routes that also accept an API key instead of a token
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False
+)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+# Column values of recently authenticated users, keyed by user id. Each worker
+# has its own copy, so changes made through another worker show up after the TTL
+user_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    "user", maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+# Current token version per user id, checked against the "ver" claim of
+# self-contained access tokens instead of loading the user row
+token_versions: TTLCache[str, int] = TTLCache(
+    "token_version",
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+)
+
+
+# Decoded access tokens keyed by a digest of the raw token, so the signature
+# check runs once per token rather than once per request
+token_cache: TTLCache[bytes, TokenPayload] = TTLCache(
+    "token", maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=0
+)
+# Cached for tokens that failed to decode
+_INVALID_TOKEN = TokenPayload()
+
+
+@dataclass(frozen=True)
+class CachedApiKey:
+    id: uuid.UUID
+    secret_hash: str
+    expires_at: datetime | None
+    owner_id: uuid.UUID
+    owner_is_superuser: bool
+    scopes: frozenset[str]
+
+
+# Active API keys by prefix, with what's needed to authorize them
+api_key_cache: TTLCache[str, CachedApiKey] = TTLCache(
+    "api_key",
+    maxsize=settings.API_KEY_CACHE_MAX_SIZE,
+    ttl=settings.API_KEY_CACHE_TTL_SECONDS,
+)
+# Cached for prefixes without an active key, so guessing doesn't hit the DB
+_UNKNOWN_API_KEY = CachedApiKey(
+    id=uuid.UUID(int=0),
+    secret_hash="",
+    expires_at=None,
+    owner_id=uuid.UUID(int=0),
+    owner_is_superuser=False,
+    scopes=frozenset(),
+)
+
+
+def invalidate_user_cache(user_id: uuid.UUID | str) -> None:
+    user_cache.invalidate(str(user_id))
+    token_versions.invalidate(str(user_id))
+
 
+async def _session_info(request: Request) -> dict[str, Any]:
+    """
+    Routing state of the request's session: who is writing, and which replica
+    reads go to. Only GET and HEAD requests of users who haven't written in
+    the last REPLICA_PIN_SECONDS read from a replica.
+    """
+    if not replica_engines:
+        return {}
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    user_id = _decode_token(token).sub if scheme.lower() == "bearer" else None
+    read_only = request.method in ("GET", "HEAD") and not (
+        user_id is not None and await replica_pins.is_pinned(user_id)
+    )
+    if settings.POSTGRES_ASYNC_DRIVER:
+        replica = pick_replica(replica_async_engines) if read_only else None
+        return {"user_id": user_id, "replica": replica and replica.sync_engine}
+    replica = pick_replica(replica_engines) if read_only else None
+    return {"user_id": user_id, "replica": replica}
 
-def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
-        yield session
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    info = await _session_info(request)
+    with raising_budget_exceeded():
+        # Objects stay usable after commit, reloading them would need an await
+        if settings.POSTGRES_ASYNC_DRIVER:
+            async with AsyncSession(
+                async_engine,
+                sync_session_class=RoutingSession,
+                info=info,
+                expire_on_commit=False,
+            ) as session:
+                try:
+                    yield session
+                finally:
+                    await replica_pins.pin_writer(session.sync_session.info)
+            return
+        threaded_session = ThreadedSession(
+            RoutingSession(engine, info=info, expire_on_commit=False)
+        )
+        try:
+            yield cast(AsyncSession, threaded_session)
+        finally:
+            await replica_pins.pin_writer(threaded_session.sync_session.info)
+            await threaded_session.close()
+
+
+SessionDep = Annotated[AsyncSession, Depends(get_db)]
+
+
+def db_time_budget(milliseconds: int) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency declaring the database time budget of a router or a route:
+    each statement of the request is cancelled after ``milliseconds``. The
+    last one declared applies, so a route can override its router.
+    """
+
+    async def apply_db_time_budget(session: SessionDep) -> None:
+        await session.run_sync(set_statement_timeout, milliseconds)
+
+    return apply_db_time_budget
+
+
+def query_budget(statements: int) -> Callable[[], None]:
+    """
+    Dependency declaring how many statements a route may run per request.
+    Going over is logged, or fails the request in QUERY_BUDGET_STRICT mode.
+    """
+
+    def apply_query_budget() -> None:
+        stats = current_query_stats()
+        if stats is not None:
+            stats.budget = statements
+
+    return apply_query_budget
 
 
-SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+async def _get_cached_user(session: AsyncSession, user_id: str | None) -> User | None:
+    if user_id is None:
+        return None
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user = await session.get(User, user_id)
+        if user:
+            user_cache.set(user_id, user.model_dump())
+        return user
+    # Attach a copy to this session as if it had been loaded, without a SELECT
+    user = User(**cached)
+    make_transient_to_detached(user)
+    session.add(user)
+    return user
+
+
+async def _get_token_version(session: AsyncSession, user_id: str) -> int | None:
+    version = token_versions.get(user_id)
+    if version is None:
+        result = await session.exec(
+            select(User.token_version).where(User.id == user_id)
+        )
+        version = result.first()
+        if version is not None:
+            token_versions.set(user_id, version)
+    return version
+
+
+def _decode_token(token: str) -> TokenPayload:
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
         token_data = TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
+        token_cache.set(
+            key, _INVALID_TOKEN, ttl=settings.TOKEN_CACHE_NEGATIVE_TTL_SECONDS
+        )
+        return _INVALID_TOKEN
+    if "exp" in payload:
+        # Never outlive the token itself
+        token_cache.set(key, token_data, ttl=payload["exp"] - time.time())
+    return token_data
+
+
+def decode_token(token: str) -> TokenPayload:
+    token_data = _decode_token(token)
+    if token_data is _INVALID_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return token_data
+
+
+async def _check_not_revoked(session: AsyncSession, token_data: TokenPayload) -> None:
+    if token_data.jti and await revocation_list.is_revoked(session, token_data.jti):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+
+
+async def _get_token_user(session: AsyncSession, token_data: TokenPayload) -> User:
+    await _check_not_revoked(session, token_data)
+    user = await _get_cached_user(session, token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if token_data.ver is not None and token_data.ver != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
 
+async def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    return await _get_token_user(session, decode_token(token))
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated caller, for routes that only need its id and role.
+    """
+
+    id: uuid.UUID
+    is_superuser: bool
+    # Granted scopes when authenticated with an API key, None for user tokens
+    scopes: frozenset[str] | None = None
+
+
+async def _get_api_key(session: AsyncSession, prefix: str) -> CachedApiKey:
+    api_key = api_key_cache.get(prefix)
+    if api_key is not None:
+        return api_key
+    row = await crud.get_active_api_key_by_prefix_async(session=session, prefix=prefix)
+    if row is None or not row[1].is_active:
+        api_key = _UNKNOWN_API_KEY
+    else:
+        db_api_key, owner = row
+        api_key = CachedApiKey(
+            id=db_api_key.id,
+            secret_hash=db_api_key.secret_hash,
+            expires_at=db_api_key.expires_at,
+            owner_id=owner.id,
+            owner_is_superuser=owner.is_superuser,
+            scopes=frozenset(db_api_key.scopes),
+        )
+    api_key_cache.set(prefix, api_key)
+    return api_key
+
+
+async def _get_api_key_principal(
+    session: AsyncSession, key: str, required_scopes: list[str]
+) -> Principal:
+    parts = security.split_api_key(key)
+    api_key = await _get_api_key(session, parts[0]) if parts else _UNKNOWN_API_KEY
+    if (
+        parts is None
+        or api_key is _UNKNOWN_API_KEY
+        or not hmac.compare_digest(
+            api_key.secret_hash, security.hash_api_key_secret(parts[1])
+        )
+        or (api_key.expires_at is not None and api_key.expires_at <= datetime.utcnow())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    # API keys are only accepted by routes that declare the scopes they need
+    if not required_scopes or not api_key.scopes.issuperset(required_scopes):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    api_key_usage.record(api_key.id)
+    return Principal(
+        id=api_key.owner_id,
+        is_superuser=api_key.owner_is_superuser,
+        scopes=api_key.scopes,
+    )
+
+
+async def get_current_principal(
+    security_scopes: SecurityScopes,
+    session: SessionDep,
+    token: Annotated[str | None, Depends(optional_oauth2)],
+    api_key: Annotated[str | None, Depends(api_key_header)],
+) -> Principal:
+    """
+    Authenticate with a bearer token or, on routes declaring scopes with
+    ``Security(get_current_principal, scopes=[...])``, an ``X-API-Key``.
+    """
+    if api_key:
+        return await _get_api_key_principal(session, api_key, security_scopes.scopes)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    token_data = decode_token(token)
+    if (
+        token_data.sub is None
+        or token_data.act is None
+        or token_data.su is None
+        or token_data.ver is None
+    ):
+        # Token without embedded claims, authorize it against the user row
+        user = await _get_token_user(session, token_data)
+        return Principal(id=user.id, is_superuser=user.is_superuser)
+    await _check_not_revoked(session, token_data)
+    version = await _get_token_version(session, token_data.sub)
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if token_data.ver != version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    if not token_data.act:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return Principal(id=uuid.UUID(token_data.sub), is_superuser=token_data.su)
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+
+
+async def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
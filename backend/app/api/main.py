@@ -1,14 +1,25 @@
 from fastapi import APIRouter
 
-from app.api.routes import category, items, login, private, product, users
+from app.api.routes import (
+    api_keys,
+    category,
+    items,
+    login,
+    private,
+    product,
+    users,
+    utils,
+)
 from app.core.config import settings
 
 api_router = APIRouter()
 api_router.include_router(login.router)
 api_router.include_router(users.router)
+api_router.include_router(utils.router)
 api_router.include_router(category.router)
 api_router.include_router(product.router)
 api_router.include_router(items.router)
+api_router.include_router(api_keys.router)
 
 
 if settings.ENVIRONMENT == "local":
@@ -0,0 +1,316 @@
+import base64
+import binascii
+import inspect
+import json
+import uuid
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Any, Generic, Literal, TypeVar
+
+from fastapi import HTTPException, Query
+from sqlalchemy import ColumnElement, bindparam, func, text
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.pipeline import pipelined
+from app.core.statements import cached_statement
+from app.crud.base import CRUDBase, ListQuery, UnsupportedQuery
+
+T = TypeVar("T")
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def encode_cursor(last_id: uuid.UUID, key: Any = None) -> str:
+    """
+    Cursor after the row ``last_id``, whose sort column holds ``key`` when
+    the list is sorted on another column than the id.
+    """
+    cursor: dict[str, Any] = {"id": last_id.hex}
+    if key is not None:
+        cursor["key"] = key
+    data = json.dumps(cursor, default=_json_default).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[uuid.UUID, Any]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return uuid.UUID(hex=data["id"]), data.get("key")
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# How list endpoints compute ``count``: ``exact`` runs a count query,
+# ``estimated`` reads the planner's row estimate, ``window`` adds
+# count(*) OVER () to the page query and ``none`` skips it
+CountMode = Literal["exact", "estimated", "window", "none"]
+
+
+@dataclass
+class Page:
+    skip: int
+    limit: int
+    # Id of the last row of the previous page, from the cursor
+    after: uuid.UUID | None
+    count: CountMode
+    # Sort column value of that row, when sorted on another column
+    after_key: Any = None
+
+
+def pagination(*, count: CountMode) -> Callable[..., Page]:
+    """
+    Dependency reading the page of a list endpoint from the query, ``count``
+    is the endpoint's default count mode.
+    """
+
+    def get_page(
+        skip: Annotated[int, Query(ge=0)] = 0,
+        limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = 100,
+        cursor: Annotated[
+            str | None,
+            Query(description="next_cursor of the previous page, instead of skip"),
+        ] = None,
+        count_mode: Annotated[
+            CountMode,
+            Query(
+                alias="count",
+                description=(
+                    "How to count the rows: exact, estimated, window (exact, "
+                    "from the cursor on when paging with one) or none"
+                ),
+            ),
+        ] = count,
+    ) -> Page:
+        after, after_key = decode_cursor(cursor) if cursor is not None else (None, None)
+        return Page(
+            skip=skip, limit=limit, after=after, count=count_mode, after_key=after_key
+        )
+
+    return get_page
+
+
+def filtering(crud: CRUDBase[Any, Any, Any]) -> Callable[..., ListQuery]:
+    """
+    Dependency reading the filters of ``crud`` from the query, with a
+    ``sort`` parameter if it has sort columns. Combinations no index of the
+    model serves are rejected with a 400.
+    """
+
+    def get_list_query(**params: Any) -> ListQuery:
+        sort = params.pop("sort", None)
+        try:
+            return crud.list_query(params, sort)
+        except UnsupportedQuery as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    parameters = [
+        inspect.Parameter(
+            param,
+            inspect.Parameter.KEYWORD_ONLY,
+            default=None,
+            annotation=Annotated[crud.filter_type(param) | None, Query()],
+        )
+        for param in crud.filters
+    ]
+    if crud.sorts:
+        sorts = ", ".join(crud.sorts)
+        parameters.append(
+            inspect.Parameter(
+                "sort",
+                inspect.Parameter.KEYWORD_ONLY,
+                default=None,
+                annotation=Annotated[
+                    str | None,
+                    Query(description=f"One of {sorts}, prefixed with - to reverse"),
+                ],
+            )
+        )
+    get_list_query.__signature__ = inspect.Signature(parameters)  # type: ignore[attr-defined]
+    return get_list_query
+
+
+_table_estimate = cached_statement(
+    text(
+        "SELECT CAST(reltuples AS bigint) FROM pg_class "
+        "WHERE oid = CAST(:table AS regclass)"
+    ),
+    table="items",
+)
+
+
+class Listing(Generic[T]):
+    """
+    Cached statements listing ``model``, optionally filtered by ``where``,
+    in pages ordered by id. Paging with the cursor (WHERE id > :after) stays
+    as fast on deep pages as on the first one, unlike the offset.
+    """
+
+    def __init__(
+        self,
+        model: type[T],
+        *,
+        where: ColumnElement[bool] | None = None,
+        **warm_params: Any,
+    ) -> None:
+        self.model = model
+        self.where = where
+        self.filtered = where is not None
+        id_column: Any = model.id  # type: ignore[attr-defined]
+        after: ColumnElement[bool] = id_column > bindparam("after")
+        rows = select(model)
+        rows_with_count = select(model, func.count().over())
+        count = select(func.count()).select_from(model)
+        self._estimate_rows = select(id_column)
+        if where is not None:
+            rows = rows.where(where)
+            rows_with_count = rows_with_count.where(where)
+            count = count.where(where)
+            self._estimate_rows = self._estimate_rows.where(where)
+        self.count = cached_statement(count, **warm_params)
+        self.offset = cached_statement(
+            rows.order_by(id_column)
+            .offset(bindparam("skip"))
+            .limit(bindparam("limit")),
+            skip=0,
+            limit=0,
+            **warm_params,
+        )
+        self.keyset = cached_statement(
+            rows.where(after).order_by(id_column).limit(bindparam("limit")),
+            after=uuid.UUID(int=0),
+            limit=0,
+            **warm_params,
+        )
+        self.offset_with_count = cached_statement(
+            rows_with_count.order_by(id_column)
+            .offset(bindparam("skip"))
+            .limit(bindparam("limit")),
+            skip=0,
+            limit=0,
+            **warm_params,
+        )
+        self.keyset_with_count = cached_statement(
+            rows_with_count.where(after).order_by(id_column).limit(bindparam("limit")),
+            after=uuid.UUID(int=0),
+            limit=0,
+            **warm_params,
+        )
+
+    async def estimate(
+        self, session: AsyncSession, query: ListQuery | None = None, **params: Any
+    ) -> int:
+        estimate_rows = self._estimate_rows
+        if query is not None:
+            estimate_rows = estimate_rows.where(*query.where)
+        elif not self.filtered:
+            table = self.model.__tablename__  # type: ignore[attr-defined]
+            estimate = (
+                await session.exec(_table_estimate, params={"table": table})  # type: ignore
+            ).scalar_one()
+            # Never analyzed yet, -1 since Postgres 14
+            if estimate >= 0:
+                return int(estimate)
+            return int((await session.exec(self.count, params=params)).one())
+        # The planner's estimate of the filtered rows, from the statistics
+        sql = estimate_rows.params(**params).compile(
+            dialect=postgresql.dialect(),  # type: ignore[no-untyped-call]
+            compile_kwargs={"literal_binds": True},
+        )
+        plan = (
+            await session.exec(
+                text("EXPLAIN (FORMAT JSON) " + str(sql).replace(":", r"\:"))  # type: ignore
+            )
+        ).scalar_one()
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _query_statements(
+        self, query: ListQuery, page: Page, window: bool
+    ) -> tuple[Any, Any]:
+        # Built per request, the compiled cache still reuses the SQL of
+        # combinations seen before
+        where = query.where if self.where is None else [self.where, *query.where]
+        rows = select(self.model, func.count().over()) if window else select(self.model)
+        rows = rows.where(*where).order_by(*query.order_by()).limit(bindparam("limit"))
+        if page.after is None:
+            rows = rows.offset(bindparam("skip"))
+        else:
+            rows = rows.where(query.after())
+        count = select(func.count()).select_from(self.model).where(*where)
+        return rows, count
+
+    async def fetch(
+        self,
+        session: AsyncSession,
+        page: Page,
+        query: ListQuery | None = None,
+        **params: Any,
+    ) -> tuple[Sequence[T], int | None, str | None]:
+        """
+        Rows of ``page``, the count in the page's count mode and the cursor of
+        the next page, None on the last one. ``query`` adds filters and a sort
+        order, ``params`` fill in ``where``.
+        """
+        window = page.count == "window"
+        if query is not None and query.is_default:
+            query = None
+        # One extra row tells whether there is a next page
+        page_params = {**params, "limit": page.limit + 1}
+        if query is not None:
+            statement, count_statement = self._query_statements(query, page, window)
+        elif page.after is None:
+            statement = self.offset_with_count if window else self.offset
+        else:
+            statement = self.keyset_with_count if window else self.keyset
+        if query is None:
+            count_statement = self.count
+        if page.after is None:
+            page_params["skip"] = page.skip
+        else:
+            page_params["after"] = page.after
+            if query is not None and query.sort is not None:
+                try:
+                    page_params["after_key"] = query.parse_sort_key(page.after_key)
+                except UnsupportedQuery as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+        rows: list[Any]
+        count: int | None = None
+        if page.count == "exact" and settings.POSTGRES_PIPELINE:
+            # Count and page in a single round trip
+            page_rows, count_rows = await pipelined(
+                session, (statement, page_params), (count_statement, params)
+            )
+            rows = [self.model.model_validate(row) for row in page_rows]  # type: ignore[attr-defined]
+            (count,) = count_rows[0].values()
+            return self._with_cursor(rows, count, page, query)
+
+        result: Any = await session.exec(statement, params=page_params)
+        if window:
+            rows_with_count = result.all()
+            rows = [row for row, _ in rows_with_count]
+            if rows_with_count:
+                count = rows_with_count[0][1]
+            elif page.skip == 0 and page.after is None:
+                count = 0
+        else:
+            rows = list(result.all())
+        if page.count == "exact":
+            count = (await session.exec(count_statement, params=params)).one()
+        elif page.count == "estimated":
+            count = await self.estimate(session, query, **params)
+        return self._with_cursor(rows, count, page, query)
+
+    @staticmethod
+    def _with_cursor(
+        rows: list[Any], count: int | None, page: Page, query: ListQuery | None
+    ) -> tuple[list[Any], int | None, str | None]:
+        if len(rows) <= page.limit:
+            return rows, count, None
+        rows = rows[: page.limit]
+        key = query.sort_key(rows[-1]) if query is not None else None
+        return rows, count, encode_cursor(rows[-1].id, key)
@@ -0,0 +1,75 @@
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from sqlmodel import col, func, select
+
+from app import crud
+from app.api.deps import CurrentUser, SessionDep, api_key_cache
+from app.models import (
+    ApiKey,
+    ApiKeyCreate,
+    ApiKeyCreated,
+    ApiKeysPublic,
+    Message,
+)
+
+router = APIRouter(prefix="/api-keys", tags=["api-keys"])
+
+
+@router.get("/", response_model=ApiKeysPublic)
+async def read_api_keys(
+    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+) -> Any:
+    """
+    Retrieve the current user's active API keys.
+    """
+    count_statement = (
+        select(func.count())
+        .select_from(ApiKey)
+        .where(ApiKey.owner_id == current_user.id)
+        .where(col(ApiKey.revoked_at).is_(None))
+    )
+    count = (await session.exec(count_statement)).one()
+    statement = (
+        select(ApiKey)
+        .where(ApiKey.owner_id == current_user.id)
+        .where(col(ApiKey.revoked_at).is_(None))
+        .order_by(col(ApiKey.created_at))
+        .offset(skip)
+        .limit(limit)
+    )
+    api_keys = (await session.exec(statement)).all()
+    return ApiKeysPublic(data=api_keys, count=count)
+
+
+@router.post("/", response_model=ApiKeyCreated)
+async def create_api_key(
+    *, session: SessionDep, current_user: CurrentUser, api_key_in: ApiKeyCreate
+) -> Any:
+    """
+    Create an API key acting as the current user within the given scopes.
+    The key is only shown in this response.
+    """
+    api_key, key = await crud.create_api_key_async(
+        session=session, api_key_in=api_key_in, owner_id=current_user.id
+    )
+    return ApiKeyCreated.model_validate(api_key, update={"key": key})
+
+
+@router.delete("/{id}")
+async def revoke_api_key(
+    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+) -> Message:
+    """
+    Revoke an API key.
+    """
+    api_key = await session.get(ApiKey, id)
+    if not api_key or api_key.revoked_at is not None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    if not current_user.is_superuser and (api_key.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    await crud.revoke_api_key_async(session=session, db_api_key=api_key)
+    # Other workers stop accepting the key once their cache entry expires
+    api_key_cache.invalidate(api_key.prefix)
+    return Message(message="API key revoked")
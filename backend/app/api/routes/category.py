@@ -1,25 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select, delete, func
-from typing import Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, Security
+from pydantic import TypeAdapter
+from typing import Annotated, Any
+import hashlib
 import uuid
 
-from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser
+from app.api.deps import (
+    SessionDep,
+    CurrentUser,
+    db_time_budget,
+    get_current_principal,
+    get_current_active_superuser,
+    query_budget,
+)
+from app import crud
+from app.api.pagination import (
+    Listing,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    pagination,
+)
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.routing import read_from_primary
 from app.models import (
     Category,
     CategoryCreate,
     CategoryUpdate,
     CategoryPublic,
     CategoriesPublic,
+    CategoryTree,
+)
+from app.schemas.product import CategoryProducts, ProductRead
+
+router = APIRouter(
+    prefix="/categories",
+    tags=["categories"],
+    dependencies=[Depends(db_time_budget(settings.DB_TIME_BUDGET_MS))],
 )
 
-router = APIRouter(prefix="/categories", tags=["categories"])
+list_categories = Listing(Category)
+
+# The serialized tree and its ETag. Writes through this worker clear it,
+# the others pick them up after the TTL
+tree_cache: TTLCache[str, tuple[str, bytes]] = TTLCache(
+    "category_tree", maxsize=1, ttl=settings.CATEGORY_TREE_CACHE_TTL_SECONDS
+)
+_tree_adapter = TypeAdapter(list[CategoryTree])
+# Bumped on every write, so a tree read before it isn't cached after it
+_tree_version = 0
+
+
+def invalidate_category_tree() -> None:
+    global _tree_version
+    _tree_version += 1
+    tree_cache.invalidate("tree")
 
 
-@router.get("/", response_model=CategoriesPublic)
-def read_categories(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
-    count = session.exec(select(func.count()).select_from(Category)).one()
-    categories = session.exec(select(Category).offset(skip).limit(limit)).all()
-    return CategoriesPublic(data=categories, count=count)
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+@router.get(
+    "/",
+    response_model=CategoriesPublic,
+    dependencies=[Depends(query_budget(3))],
+)
+async def read_categories(
+    session: SessionDep, page: Annotated[Page, Depends(pagination(count="exact"))]
+) -> Any:
+    categories, count, next_cursor = await list_categories.fetch(session, page)
+    return CategoriesPublic(data=categories, count=count, next_cursor=next_cursor)
 
 
 @router.post(
@@ -27,40 +79,133 @@ def read_categories(session: SessionDep, skip: int = 0, limit: int = 100) -> Any
     response_model=CategoryPublic,
     dependencies=[Depends(get_current_active_superuser)],
 )
-def create_category(session: SessionDep, category_in: CategoryCreate) -> Any:
-    category = Category.model_validate(category_in)
-    session.add(category)
-    session.commit()
-    session.refresh(category)
+async def create_category(session: SessionDep, category_in: CategoryCreate) -> Any:
+    category = await crud.crud_category.create_category_async(
+        session=session, category_in=category_in
+    )
+    invalidate_category_tree()
     return category
 
 
-@router.get("/{category_id}", response_model=CategoryPublic)
-def read_category(category_id: uuid.UUID, session: SessionDep) -> Any:
-    category = session.get(Category, category_id)
+@router.get(
+    "/tree",
+    response_model=list[CategoryTree],
+    dependencies=[Depends(query_budget(2))],
+)
+async def read_category_tree(
+    session: SessionDep,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """
+    All the categories, nested under their parents. Send the ETag back in
+    If-None-Match to get a 304 while the tree hasn't changed.
+    """
+    cached = tree_cache.get("tree")
+    if cached is None:
+        version = _tree_version
+        # Served to everyone until the TTL, so not from a lagging replica
+        with read_from_primary(session.sync_session):
+            tree = await crud.crud_category.get_category_tree_async(session=session)
+        body = _tree_adapter.dump_json(tree)
+        # From the content, so that all workers agree on it
+        cached = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        if version == _tree_version:
+            tree_cache.set("tree", cached)
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/{category_id}",
+    response_model=CategoryPublic,
+    dependencies=[Depends(query_budget(2))],
+)
+async def read_category(category_id: uuid.UUID, session: SessionDep) -> Any:
+    category = await session.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
 
 
+@router.get(
+    "/{category_id}/ancestors",
+    response_model=list[CategoryPublic],
+    dependencies=[Depends(query_budget(2))],
+)
+async def read_category_ancestors(category_id: uuid.UUID, session: SessionDep) -> Any:
+    """
+    The category and its ancestors, from the root down, for breadcrumbs.
+    """
+    ancestors = await crud.crud_category.get_category_ancestors_async(
+        session=session, category_id=category_id
+    )
+    if not ancestors:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return ancestors
+
+
+@router.get(
+    "/{category_id}/products",
+    response_model=CategoryProducts,
+    dependencies=[
+        Depends(query_budget(2)),
+        Security(get_current_principal, scopes=["products:read"]),
+    ],
+)
+async def read_category_products(
+    category_id: uuid.UUID,
+    session: SessionDep,
+    limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = 100,
+    cursor: Annotated[
+        str | None, Query(description="next_cursor of the previous page")
+    ] = None,
+) -> Any:
+    """
+    Products of the category and of all its subcategories, ordered by
+    category then id.
+    """
+    after = None
+    if cursor is not None:
+        after_id, after_category = decode_cursor(cursor)
+        try:
+            after = (uuid.UUID(after_category), after_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    # One extra row tells whether there is a next page
+    products = await crud.crud_category.get_subtree_products_async(
+        session=session, category_id=category_id, limit=limit + 1, after=after
+    )
+    next_cursor = None
+    if len(products) > limit:
+        last = products[limit - 1]
+        next_cursor = encode_cursor(last.id, str(last.category_id))
+    return CategoryProducts(
+        data=[ProductRead.model_validate(p) for p in products[:limit]],
+        next_cursor=next_cursor,
+    )
+
+
 @router.patch(
     "/{category_id}",
     response_model=CategoryPublic,
     dependencies=[Depends(get_current_active_superuser)],
 )
-def update_category(
+async def update_category(
     category_id: uuid.UUID, session: SessionDep, category_in: CategoryUpdate
 ) -> Any:
-    db_category = session.get(Category, category_id)
+    db_category = await session.get(Category, category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
-
-    for key, value in category_in.model_dump(exclude_unset=True).items():
-        setattr(db_category, key, value)
-
-    session.add(db_category)
-    session.commit()
-    session.refresh(db_category)
+    try:
+        db_category = await crud.crud_category.update_category_async(
+            session=session, db_obj=db_category, obj_in=category_in
+        )
+    except crud.crud_category.CategoryCycle as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    invalidate_category_tree()
     return db_category
 
 
@@ -69,10 +214,10 @@ def update_category(
     response_model=dict,
     dependencies=[Depends(get_current_active_superuser)],
 )
-def delete_category(category_id: uuid.UUID, session: SessionDep) -> Any:
-    category = session.get(Category, category_id)
+async def delete_category(category_id: uuid.UUID, session: SessionDep) -> Any:
+    category = await session.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    session.delete(category)
-    session.commit()
+    await crud.crud_category.delete_category_async(session=session, db_obj=category)
+    invalidate_category_tree()
     return {"message": "Category deleted successfully"}
@@ -1,16 +1,33 @@
-from datetime import timedelta
+import math
+from datetime import datetime, timedelta, timezone
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app import crud
+from app.api.deps import (
+    CurrentUser,
+    SessionDep,
+    TokenDep,
+    decode_token,
+    get_current_active_superuser,
+    invalidate_user_cache,
+)
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
-from app.crud import crud
-from app.models import Message, NewPassword, Token, UserPublic
+from app.core.security import get_password_hash_async
+from app.core.throttling import client_ip, login_throttle
+from app.models import (
+    Message,
+    NewPassword,
+    RefreshTokenRequest,
+    Token,
+    User,
+    UserPublic,
+)
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
@@ -21,30 +38,114 @@ from app.utils import (
 router = APIRouter(tags=["login"])
 
 
+def create_user_access_token(user: User) -> str:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = None
+    if settings.ACCESS_TOKEN_EMBED_CLAIMS:
+        claims = security.principal_claims(
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            token_version=user.token_version,
+        )
+    return security.create_access_token(
+        user.id, expires_delta=access_token_expires, claims=claims
+    )
+
+
 @router.post("/login/access-token")
-def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+async def login_access_token(
+    request: Request,
+    session: SessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.authenticate(
+    ip = client_ip(request)
+    retry_after = await login_throttle.retry_after(email=form_data.username, ip=ip)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    user = await crud.authenticate_async(
         session=session, email=form_data.username, password=form_data.password
     )
     if not user:
+        await login_throttle.record_failure(email=form_data.username, ip=ip)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    elif not user.is_active:
+    await login_throttle.reset(email=form_data.username)
+    if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token = await crud.create_refresh_token_async(
+        session=session, user_id=user.id
+    )
     return Token(
-        access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
+        access_token=create_user_access_token(user), refresh_token=refresh_token
+    )
+
+
+@router.post("/login/refresh-token")
+async def refresh_access_token(session: SessionDep, body: RefreshTokenRequest) -> Token:
+    """
+    Exchange a refresh token for a new access token and a new refresh token
+    """
+    db_token = await crud.get_refresh_token_async(
+        session=session, token=body.refresh_token
+    )
+    if not db_token or db_token.revoked_at or db_token.expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
+    if not await crud.mark_refresh_token_used_async(session=session, db_token=db_token):
+        # A rotated token came back, so it leaked: revoke its whole family
+        await crud.revoke_refresh_token_family_async(
+            session=session, family_id=db_token.family_id
         )
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
+    user = await session.get(User, db_token.user_id)
+    if not user or not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    refresh_token = await crud.create_refresh_token_async(
+        session=session, user_id=user.id, family_id=db_token.family_id
+    )
+    return Token(
+        access_token=create_user_access_token(user), refresh_token=refresh_token
     )
 
 
+@router.post("/login/revoke-refresh-tokens")
+async def revoke_refresh_tokens(
+    session: SessionDep, current_user: CurrentUser
+) -> Message:
+    """
+    Revoke every refresh token of the current user
+    """
+    await crud.revoke_user_refresh_tokens_async(
+        session=session, user_id=current_user.id
+    )
+    return Message(message="Refresh tokens revoked")
+
+
+@router.post("/logout")
+async def logout(
+    session: SessionDep, token: TokenDep, _current_user: CurrentUser
+) -> Message:
+    """
+    Revoke the access token used for this request
+    """
+    token_data = decode_token(token)
+    if token_data.jti and token_data.exp:
+        expires_at = datetime.fromtimestamp(token_data.exp, timezone.utc)
+        await crud.revoke_access_token_async(
+            session=session,
+            jti=token_data.jti,
+            expires_at=expires_at.replace(tzinfo=None),
+        )
+    return Message(message="Access token revoked")
+
+
 @router.post("/login/test-token", response_model=UserPublic)
-def test_token(current_user: CurrentUser) -> Any:
+async def test_token(current_user: CurrentUser) -> Any:
     """
     Test access token
     """
@@ -52,11 +153,11 @@ def test_token(current_user: CurrentUser) -> Any:
 
 
 @router.post("/password-recovery/{email}")
-def recover_password(email: str, session: SessionDep) -> Message:
+async def recover_password(email: str, session: SessionDep) -> Message:
     """
     Password Recovery
     """
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await crud.get_user_by_email_async(session=session, email=email)
 
     if not user:
         raise HTTPException(
@@ -67,7 +168,8 @@ def recover_password(email: str, session: SessionDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    await run_in_threadpool(
+        send_email,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -76,14 +178,14 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: SessionDep, body: NewPassword) -> Message:
     """
     Reset password
     """
     email = verify_password_reset_token(token=body.token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await crud.get_user_by_email_async(session=session, email=email)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -91,10 +193,13 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
+    hashed_password = await get_password_hash_async(password=body.new_password)
     user.hashed_password = hashed_password
+    user.token_version += 1
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user_cache(user.id)
+    await crud.revoke_user_refresh_tokens_async(session=session, user_id=user.id)
     return Message(message="Password updated successfully")
 
 
@@ -103,11 +208,11 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     dependencies=[Depends(get_current_active_superuser)],
     response_class=HTMLResponse,
 )
-def recover_password_html_content(email: str, session: SessionDep) -> Any:
+async def recover_password_html_content(email: str, session: SessionDep) -> Any:
     """
     HTML Content for Password Recovery
     """
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await crud.get_user_by_email_async(session=session, email=email)
 
     if not user:
         raise HTTPException(
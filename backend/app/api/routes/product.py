@@ -1,58 +1,199 @@
 import uuid
-from typing import Any
-
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
-
-from app.api.deps import CurrentUser, SessionDep
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+
+from app import crud
+from app.api.deps import (
+    CurrentUser,
+    SessionDep,
+    db_time_budget,
+    get_current_principal,
+    query_budget,
+)
+from app.api.pagination import (
+    Listing,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    filtering,
+    pagination,
+)
+from app.core.autocomplete import product_suggestions
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.routing import read_from_primary
+from app.crud.base import ListQuery
+from app.crud.crud_product import ProductFacet
 from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductRead, ProductUpdate
+from app.schemas.product import (
+    ProductCreate,
+    ProductFacets,
+    ProductRead,
+    ProductSearchHit,
+    ProductSearchResults,
+    ProductSuggestion,
+    ProductUpdate,
+)
 from app.models.message import (
     Message,
 )  # same model used for "Item deleted successfully"
 
-router = APIRouter(prefix="/products", tags=["products"])
-
-
-@router.get("/", response_model=dict)
-def read_products(
+router = APIRouter(
+    prefix="/products",
+    tags=["products"],
+    dependencies=[Depends(db_time_budget(settings.DB_TIME_BUDGET_MS))],
+)
+
+list_products = Listing(Product)
+
+# Facet counts by normalized filters and facets, per worker, so they can be
+# stale by up to the TTL
+facets_cache: TTLCache[tuple[Any, ...], ProductFacets] = TTLCache(
+    "product_facets",
+    maxsize=settings.PRODUCT_FACETS_CACHE_MAX_SIZE,
+    ttl=settings.PRODUCT_FACETS_CACHE_TTL_SECONDS,
+)
+
+
+@router.get(
+    "/",
+    response_model=dict,
+    dependencies=[
+        Depends(query_budget(5)),
+        Security(get_current_principal, scopes=["products:read"]),
+    ],
+)
+async def read_products(
     session: SessionDep,
-    current_user: CurrentUser,
-    skip: int = 0,
-    limit: int = 100,
+    page: Annotated[Page, Depends(pagination(count="exact"))],
+    query: Annotated[ListQuery, Depends(filtering(crud.crud_product.product))],
+    facets: Annotated[
+        list[ProductFacet] | None,
+        Query(description="Counts of the matching products to return, by value"),
+    ] = None,
 ) -> Any:
     """
     Retrieve products.
     """
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Product)
-        count = session.exec(count_statement).one()
-        statement = select(Product).offset(skip).limit(limit)
-        products = session.exec(statement).all()
-    else:
-        # if products had an owner_id, you’d filter here
-        count_statement = select(func.count()).select_from(Product)
-        count = session.exec(count_statement).one()
-        statement = select(Product).offset(skip).limit(limit)
-        products = session.exec(statement).all()
-
-    return {"data": products, "count": count}
-
-
-@router.get("/{id}", response_model=ProductRead)
-def read_product(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+    # if products had an owner_id, you’d filter here for non-superusers
+    products, count, next_cursor = await list_products.fetch(session, page, query)
+
+    response: dict[str, Any] = {
+        "data": products,
+        "count": count,
+        "next_cursor": next_cursor,
+    }
+    if facets:
+        requested = tuple(sorted(set(facets)))
+        key = (query.filters, requested)
+        facet_counts = facets_cache.get(key)
+        if facet_counts is None:
+            # Served to everyone until the TTL, so not from a lagging replica
+            with read_from_primary(session.sync_session):
+                facet_counts = await crud.crud_product.product_facets_async(
+                    session=session, query=query, facets=requested
+                )
+            facets_cache.set(key, facet_counts)
+        response["facets"] = facet_counts
+    return response
+
+
+@router.get(
+    "/search",
+    response_model=ProductSearchResults,
+    dependencies=[
+        Depends(query_budget(5)),
+        Security(get_current_principal, scopes=["products:read"]),
+    ],
+)
+async def search_products(
+    session: SessionDep,
+    q: Annotated[
+        str,
+        Query(
+            min_length=1,
+            max_length=200,
+            description="Words to find in the name, description or SKU. "
+            'Supports "quoted phrases", OR and -excluded words',
+        ),
+    ],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Annotated[
+        str | None, Query(description="next_cursor of the previous page")
+    ] = None,
+) -> Any:
+    """
+    Search products, best matches first. Only the
+    PRODUCT_SEARCH_MAX_CANDIDATES most recently added matches are ranked,
+    ``capped`` tells when older ones were left out.
+    """
+    after = None
+    if cursor is not None:
+        after_id, after_rank = decode_cursor(cursor)
+        if not isinstance(after_rank, (int, float)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (float(after_rank), after_id)
+    # One extra row tells whether there is a next page
+    rows = await crud.crud_product.search_products_async(
+        session=session, q=q, limit=limit + 1, after=after
+    )
+    hits = [
+        ProductSearchHit(
+            **ProductRead.model_validate(product).model_dump(),
+            rank=rank,
+            snippet=crud.crud_product.highlight(snippet),
+        )
+        for product, rank, snippet, _ in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(hits[-1].id, hits[-1].rank)
+    capped = bool(rows) and rows[0][3]
+    return ProductSearchResults(data=hits, next_cursor=next_cursor, capped=capped)
+
+
+@router.get(
+    "/suggest",
+    response_model=list[ProductSuggestion],
+    dependencies=[
+        Depends(query_budget(3)),
+        Security(get_current_principal, scopes=["products:read"]),
+    ],
+)
+async def suggest_products(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=20)] = 10,
+) -> Any:
+    """
+    Products whose name has a word, or whose SKU, starting with q, for search
+    as you type. Answered from this worker's memory, so changes made through
+    other workers can take a few seconds to show.
+    """
+    return product_suggestions.suggest(q, limit)
+
+
+@router.get(
+    "/{id}",
+    response_model=ProductRead,
+    dependencies=[
+        Depends(query_budget(4)),
+        Security(get_current_principal, scopes=["products:read"]),
+    ],
+)
+async def read_product(session: SessionDep, id: uuid.UUID) -> Any:
     """
     Get product by ID.
     """
-    product = session.get(Product, id)
+    product = await session.get(Product, id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 
 @router.post("/", response_model=ProductRead)
-def create_product(
+async def create_product(
     *,
     session: SessionDep,
     current_user: CurrentUser,
@@ -63,13 +204,16 @@ def create_product(
     """
     db_product = Product.model_validate(product_in)
     session.add(db_product)
-    session.commit()
-    session.refresh(db_product)
+    await session.commit()
+    await session.refresh(db_product)
+    product_suggestions.upsert(
+        db_product.id, db_product.name, db_product.sku, db_product.is_active
+    )
     return db_product
 
 
 @router.put("/{id}", response_model=ProductRead)
-def update_product(
+async def update_product(
     *,
     session: SessionDep,
     current_user: CurrentUser,
@@ -79,29 +223,33 @@ def update_product(
     """
     Update a product.
     """
-    db_product = session.get(Product, id)
+    db_product = await session.get(Product, id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     update_dict = product_in.model_dump(exclude_unset=True)
     db_product.sqlmodel_update(update_dict)
     session.add(db_product)
-    session.commit()
-    session.refresh(db_product)
+    await session.commit()
+    await session.refresh(db_product)
+    product_suggestions.upsert(
+        db_product.id, db_product.name, db_product.sku, db_product.is_active
+    )
     return db_product
 
 
 @router.delete("/{id}", response_model=Message)
-def delete_product(
+async def delete_product(
     session: SessionDep, current_user: CurrentUser, id: uuid.UUID
 ) -> Message:
     """
     Delete a product.
     """
-    db_product = session.get(Product, id)
+    db_product = await session.get(Product, id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    session.delete(db_product)
-    session.commit()
+    await session.delete(db_product)
+    await session.commit()
+    product_suggestions.remove(id)
     return Message(message="Product deleted successfully")
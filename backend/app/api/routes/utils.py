@@ -1,7 +1,13 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.db import async_engine, engine
+from app.core.metrics import registry
+from app.core.pool import InstrumentedQueuePool
+from app.core.slow_queries import slow_query_log
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -26,6 +32,46 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/metrics/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_metrics() -> dict[str, Any]:
+    """
+    In-process metrics of the worker that serves the request.
+    """
+    return registry.snapshot()
+
+
+@router.get(
+    "/db-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def read_db_pool() -> dict[str, Any]:
+    """
+    Connection pool status of the worker that serves the request, for the sync
+    and the async engine.
+    """
+    pools = {"sync": engine.pool, "async": async_engine.pool}
+    stats = {}
+    for name, pool in pools.items():
+        assert isinstance(pool, InstrumentedQueuePool)
+        stats[name] = pool.stats()
+    return stats
+
+
+@router.get(
+    "/slow-queries/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_slow_queries() -> list[dict[str, Any]]:
+    """
+    Latest slow statements seen by the worker that serves the request, newest
+    first, with their plan when one was captured.
+    """
+    return slow_query_log.entries()
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
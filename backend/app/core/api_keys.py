@@ -0,0 +1,74 @@
+import logging
+import threading
+import uuid
+from datetime import datetime
+
+from sqlmodel import Session, col, update
+
+from app.core.db import engine
+from app.core.metrics import registry
+from app.models import ApiKey
+
+logger = logging.getLogger(__name__)
+
+api_key_usage_flushes = registry.counter(
+    "api_key_usage_flushes_total", "Batches of API key usage written to the database"
+)
+
+
+class ApiKeyUsage:
+    """
+    Per-worker tally of API key uses. Checking a key only bumps a counter in
+    memory, the totals are written with one UPDATE per key on each flush.
+    """
+
+    def __init__(self) -> None:
+        self._counts: dict[uuid.UUID, int] = {}
+        self._last_used: dict[uuid.UUID, datetime] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key_id: uuid.UUID) -> None:
+        with self._lock:
+            self._counts[key_id] = self._counts.get(key_id, 0) + 1
+            self._last_used[key_id] = datetime.utcnow()
+
+    def pending(self) -> int:
+        return sum(self._counts.values())
+
+    def flush(self, session: Session) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            last_used, self._last_used = self._last_used, {}
+        if not counts:
+            return
+        try:
+            for key_id, count in counts.items():
+                statement = (
+                    update(ApiKey)
+                    .where(col(ApiKey.id) == key_id)
+                    .values(
+                        usage_count=col(ApiKey.usage_count) + count,
+                        last_used_at=last_used[key_id],
+                    )
+                )
+                session.exec(statement)  # type: ignore
+            session.commit()
+        except Exception:
+            # Keep the counts for the next flush
+            with self._lock:
+                for key_id, count in counts.items():
+                    self._counts[key_id] = self._counts.get(key_id, 0) + count
+                    self._last_used.setdefault(key_id, last_used[key_id])
+            raise
+        api_key_usage_flushes.inc()
+
+
+api_key_usage = ApiKeyUsage()
+
+
+def flush_api_key_usage() -> None:
+    try:
+        with Session(engine) as session:
+            api_key_usage.flush(session)
+    except Exception:
+        logger.exception("Failed to flush API key usage")
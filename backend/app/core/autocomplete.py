@@ -0,0 +1,258 @@
+import bisect
+import itertools
+import logging
+import threading
+import time
+import unicodedata
+import uuid
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import registry
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+suggestion_products = registry.gauge(
+    "product_suggestions_products", "Products in this worker's suggestion index"
+)
+suggestion_products_skipped = registry.counter(
+    "product_suggestions_skipped_total",
+    "Products left out of the suggestion index because it was full",
+)
+
+# Longest indexed prefix, longer queries are cut to it and checked in full
+KEY_LENGTH = 32
+
+
+def normalize(text: str) -> str:
+    """
+    Case and accent insensitive form of ``text``, with single spaces.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+class Suggestion(NamedTuple):
+    id: uuid.UUID
+    name: str
+    sku: str
+
+
+class SuggestionIndex:
+    """
+    Sorted array of keys searched by binary search. Each product has a key
+    for its SKU and one per word of its name, running to the end of the
+    name, so "pho" and "phone ca" both find "Red phone case".
+
+    Keys are cut to ``KEY_LENGTH`` characters and point to the product's slot
+    in a list, which keeps an entry to a short string. At most
+    ``max_products`` products are indexed.
+    """
+
+    def __init__(self, max_products: int) -> None:
+        self.max_products = max_products
+        self._entries: list[str] = []
+        self._slots: list[Suggestion | None] = []
+        self._slot_by_id: dict[uuid.UUID, int] = {}
+        self._free_slots: list[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    @staticmethod
+    def _keys(name: str, sku: str) -> set[str]:
+        words = normalize(name).split(" ")
+        keys = {" ".join(words[i:])[:KEY_LENGTH] for i in range(len(words))}
+        keys.add(normalize(sku)[:KEY_LENGTH])
+        keys.discard("")
+        return keys
+
+    def _add(self, suggestion: Suggestion) -> None:
+        if suggestion.id in self._slot_by_id:
+            self._remove(suggestion.id)
+        if len(self._slot_by_id) >= self.max_products:
+            suggestion_products_skipped.inc()
+            return
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._slots[slot] = suggestion
+        else:
+            slot = len(self._slots)
+            self._slots.append(suggestion)
+        self._slot_by_id[suggestion.id] = slot
+        for key in self._keys(suggestion.name, suggestion.sku):
+            bisect.insort(self._entries, f"{key}\0{slot}")
+
+    def _remove(self, product_id: uuid.UUID) -> None:
+        slot = self._slot_by_id.pop(product_id, None)
+        if slot is None:
+            return
+        suggestion = self._slots[slot]
+        assert suggestion is not None
+        for key in self._keys(suggestion.name, suggestion.sku):
+            entry = f"{key}\0{slot}"
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+        self._slots[slot] = None
+        self._free_slots.append(slot)
+
+    def upsert(self, product_id: uuid.UUID, name: str, sku: str, active: bool) -> None:
+        with self._lock:
+            if active:
+                self._add(Suggestion(product_id, name, sku))
+            else:
+                self._remove(product_id)
+            suggestion_products.set(len(self._slot_by_id))
+
+    def remove(self, product_id: uuid.UUID) -> None:
+        with self._lock:
+            self._remove(product_id)
+            suggestion_products.set(len(self._slot_by_id))
+
+    def load(self, suggestions: Iterable[Suggestion]) -> None:
+        """
+        Replace the content of the index.
+        """
+        slots: list[Suggestion | None] = []
+        entries = []
+        for suggestion in suggestions:
+            if len(slots) >= self.max_products:
+                suggestion_products_skipped.inc()
+                continue
+            for key in self._keys(suggestion.name, suggestion.sku):
+                entries.append(f"{key}\0{len(slots)}")
+            slots.append(suggestion)
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._slots = slots
+            self._slot_by_id = {s.id: i for i, s in enumerate(slots) if s}
+            self._free_slots = []
+            suggestion_products.set(len(slots))
+
+    def _matches(self, prefix: str) -> Iterator[int]:
+        # Slots of the keys starting with ``prefix``
+        entries = self._entries
+        i = bisect.bisect_left(entries, prefix)
+        while i < len(entries) and entries[i].startswith(prefix):
+            yield int(entries[i].rpartition("\0")[2])
+            i += 1
+
+    def _next_chars(self, stem: str) -> Iterator[str]:
+        # Characters following ``stem`` in some key, skipping from one to the
+        # next instead of scanning the keys in between
+        entries = self._entries
+        i = bisect.bisect_left(entries, stem)
+        while i < len(entries) and entries[i].startswith(stem):
+            c = entries[i][len(stem)]
+            if c != "\0":
+                yield c
+            i = bisect.bisect_left(entries, stem + chr(ord(c) + 1), i)
+
+    def _typos(self, prefix: str) -> Iterator[str]:
+        # Prefixes one deletion, transposition, substitution or insertion
+        # away from ``prefix``, only trying characters that lead to a key
+        for i in range(len(prefix)):
+            yield prefix[:i] + prefix[i + 1 :]
+        for i in range(len(prefix) - 1):
+            yield prefix[:i] + prefix[i + 1] + prefix[i] + prefix[i + 2 :]
+        for i in range(len(prefix)):
+            for c in self._next_chars(prefix[:i]):
+                if c != prefix[i]:
+                    yield prefix[:i] + c + prefix[i + 1 :]
+                yield prefix[:i] + c + prefix[i:]
+
+    def suggest(self, query: str, limit: int, typos: bool = True) -> list[Suggestion]:
+        """
+        Up to ``limit`` products whose name has a word, or whose SKU, starting
+        with ``query``. If there are fewer than ``limit`` of them, queries of
+        at least 3 characters are completed with products one typo away.
+        """
+        full_query = normalize(query)
+        prefix = full_query[:KEY_LENGTH]
+        if not prefix:
+            return []
+        found: dict[int, Suggestion] = {}
+        with self._lock:
+            prefixes: Iterable[str] = [prefix]
+            if typos and len(prefix) >= 3:
+                prefixes = itertools.chain(prefixes, self._typos(prefix))
+            for candidate in prefixes:
+                for slot in self._matches(candidate):
+                    suggestion = self._slots[slot]
+                    if slot in found or suggestion is None:
+                        continue
+                    # Keys are cut short, check the rest of a long query
+                    if len(full_query) > KEY_LENGTH and candidate == prefix:
+                        text = f"{suggestion.name} {suggestion.sku}"
+                        if full_query not in normalize(text):
+                            continue
+                    found[slot] = suggestion
+                    if len(found) >= limit:
+                        return list(found.values())
+        return list(found.values())
+
+
+class ProductSuggestions(SuggestionIndex):
+    """
+    Suggestion index over the active products, refreshed from the database.
+
+    The routes that write products update their worker's index directly.
+    Every ``refresh_interval`` seconds the changes made through other workers
+    are read from ``updated_at``. Deleted products are only noticed by the
+    full reload every ``rebuild_interval`` seconds.
+    """
+
+    # Re-read rows updated shortly before the last refresh, in case their
+    # transaction committed after it ran
+    OVERLAP = timedelta(seconds=5)
+
+    def __init__(
+        self, *, max_products: int, refresh_interval: float, rebuild_interval: float
+    ) -> None:
+        super().__init__(max_products)
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._last_updated_at: datetime | None = None
+        self._next_rebuild = 0.0
+
+    def refresh(self, session: Session) -> None:
+        # Product.updated_at is set by the workers, compare it to their clock
+        started_at = datetime.utcnow()
+        if self._last_updated_at is None or time.monotonic() >= self._next_rebuild:
+            statement = select(Product.id, Product.name, Product.sku).where(
+                col(Product.is_active)
+            )
+            self.load(Suggestion(*row) for row in session.exec(statement))
+            self._next_rebuild = time.monotonic() + self.rebuild_interval
+        else:
+            changed = select(
+                Product.id, Product.name, Product.sku, Product.is_active
+            ).where(col(Product.updated_at) > self._last_updated_at - self.OVERLAP)
+            for id, name, sku, is_active in session.exec(changed):
+                self.upsert(id, name, sku, is_active)
+        self._last_updated_at = started_at
+
+
+product_suggestions = ProductSuggestions(
+    max_products=settings.PRODUCT_SUGGEST_MAX_PRODUCTS,
+    refresh_interval=settings.PRODUCT_SUGGEST_REFRESH_SECONDS,
+    rebuild_interval=settings.PRODUCT_SUGGEST_REBUILD_SECONDS,
+)
+
+
+def refresh_product_suggestions() -> None:
+    try:
+        with Session(engine) as session:
+            product_suggestions.refresh(session)
+    except Exception:
+        logger.exception("Failed to refresh the product suggestions")
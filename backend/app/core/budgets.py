@@ -0,0 +1,78 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from psycopg import errors
+from sqlalchemy import Connection, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.core.metrics import registry
+from app.core.routing import RoutingSession
+
+# Session.info key holding the statement timeout of the session, in milliseconds
+STATEMENT_TIMEOUT_KEY = "statement_timeout_ms"
+# Session.info key holding the connections of the current transaction, one
+# per engine it used: the primary's and a replica's
+_CONNECTIONS_KEY = "statement_timeout_connections"
+
+
+def _set_local_timeout(connection: Connection, timeout: int) -> None:
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _apply_statement_timeout(
+    session: Session, _transaction: SessionTransaction, connection: Connection
+) -> None:
+    # Called for each connection of the transaction. SET LOCAL ends with the
+    # transaction, so apply it to every one
+    session.info.setdefault(_CONNECTIONS_KEY, []).append(connection)
+    timeout = session.info.get(STATEMENT_TIMEOUT_KEY)
+    if timeout:
+        _set_local_timeout(connection, timeout)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _forget_connections(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_CONNECTIONS_KEY, None)
+
+
+def set_statement_timeout(session: Session, milliseconds: int) -> None:
+    """
+    Set the statement timeout of the session: on the connections its
+    transaction already uses, primary and replica alike, and on those it
+    begins later.
+    """
+    session.info[STATEMENT_TIMEOUT_KEY] = milliseconds
+    for connection in session.info.get(_CONNECTIONS_KEY, []):
+        _set_local_timeout(connection, milliseconds)
+
+
+class DBTimeBudgetExceeded(Exception):
+    pass
+
+
+def is_statement_timeout(exc: DBAPIError) -> bool:
+    return isinstance(exc.orig, errors.QueryCanceled)
+
+
+@contextmanager
+def raising_budget_exceeded() -> Iterator[None]:
+    """
+    Raise the statement timeouts of the block as DBTimeBudgetExceeded, so
+    that only they get its handler's 504 and other database errors stay 500s.
+    """
+    try:
+        yield
+    except DBAPIError as e:
+        if is_statement_timeout(e):
+            raise DBTimeBudgetExceeded(str(e.orig)) from e
+        raise
+
+
+def count_budget_exceeded(route: str) -> None:
+    registry.counter(
+        f'db_time_budget_exceeded_total{{route="{route}"}}',
+        "Requests cancelled for running a statement past their time budget",
+    ).inc()
@@ -34,8 +34,42 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Sign active/superuser status and the token version into access tokens
+    ACCESS_TOKEN_EMBED_CLAIMS: bool = False
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+    TOKEN_CACHE_NEGATIVE_TTL_SECONDS: int = 30
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # How often each worker picks up tokens revoked through other workers
+    TOKEN_REVOCATION_REFRESH_SECONDS: int = 5
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 60 * 15
+    LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT: int = 10
+    LOGIN_THROTTLE_MAX_FAILURES_PER_IP: int = 100
+    # Share failure counters between workers, per-process memory otherwise
+    LOGIN_THROTTLE_REDIS_URL: str | None = None
+    # Addresses or networks of the reverse proxies trusted to set
+    # X-Forwarded-For, like Traefik's, or "*". Behind a proxy missing from
+    # it, every login seems to come from the proxy and shares one per-IP
+    # failure counter. Uvicorn reads the same variable for --forwarded-allow-ips
+    FORWARDED_ALLOW_IPS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
+    # bcrypt cost factor, see scripts/calibrate_bcrypt.py. Hashes with another
+    # cost are rehashed on the next successful login
+    BCRYPT_ROUNDS: int = 12
+    # Worker processes for bcrypt, defaults to one per CPU core
+    PASSWORD_HASH_MAX_WORKERS: int | None = None
+    # Hashing jobs allowed to wait for a worker before requests get a 503
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: int = 60
+    # A revoked API key keeps working on other workers for at most this long
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    API_KEY_CACHE_MAX_SIZE: int = 10_000
+    # How often per-key usage counters are written to the database
+    API_KEY_USAGE_FLUSH_SECONDS: int = 10
 
     BACKEND_CORS_ORIGINS: Annotated[
         list[AnyUrl] | str, BeforeValidator(parse_cors)
@@ -68,6 +102,71 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Run the queries of API requests on psycopg's async driver. When off they
+    # run on the sync driver in the threadpool, to compare both under load
+    POSTGRES_ASYNC_DRIVER: bool = True
+    # Per engine and worker process. API requests mostly use the engine picked
+    # by POSTGRES_ASYNC_DRIVER, keep
+    # workers * (POSTGRES_POOL_SIZE + POSTGRES_MAX_OVERFLOW) below the
+    # server's max_connections
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a free connection before failing the request
+    POSTGRES_POOL_TIMEOUT: float = 30
+    # Replace connections older than this many seconds, -1 to keep them
+    POSTGRES_POOL_RECYCLE: int = 1800
+    # Test connections on checkout, so ones dropped by the server are replaced
+    POSTGRES_POOL_PRE_PING: bool = True
+    # Reuse the most recently returned connection first, letting idle ones
+    # above the pool size time out on the server side
+    POSTGRES_POOL_USE_LIFO: bool = True
+    # Extra driver arguments, e.g. {"connect_timeout": 10} as JSON
+    POSTGRES_CONNECT_ARGS: dict[str, Any] = {}
+    # Executions of a query on a connection before psycopg prepares it on the
+    # server, None disables it (needed behind PgBouncer in transaction mode)
+    POSTGRES_PREPARE_THRESHOLD: int | None = 5
+    # SQL strings compiled by SQLAlchemy that each engine keeps
+    SQLALCHEMY_COMPILED_CACHE_SIZE: int = 500
+    # Send the count and the page of exact counted lists in one round trip
+    POSTGRES_PIPELINE: bool = True
+    # SQLAlchemy URLs of read replicas, GET requests read from one of them
+    POSTGRES_REPLICA_URIS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    # After writing, a user's reads go to the primary for this long so they
+    # don't miss their own change while it replicates
+    REPLICA_PIN_SECONDS: int = 5
+    # Share these markers between workers, per-process memory otherwise
+    REPLICA_PIN_REDIS_URL: str | None = None
+    # Statement timeout of the API routers, routes can declare their own
+    DB_TIME_BUDGET_MS: int = 2000
+    # Largest page the list endpoints return
+    MAX_PAGE_SIZE: int = 1000
+    # Matches of a product search that are ranked, the most recently added
+    PRODUCT_SEARCH_MAX_CANDIDATES: int = 2000
+    # Per-worker index of product names and SKUs for /products/suggest
+    PRODUCT_SUGGEST_MAX_PRODUCTS: int = 100_000
+    PRODUCT_SUGGEST_REFRESH_SECONDS: int = 10
+    PRODUCT_SUGGEST_REBUILD_SECONDS: int = 600
+    # Upper bounds of the price buckets counted by the product list facets,
+    # the last bucket has no upper bound
+    PRODUCT_PRICE_FACET_BOUNDS: list[int] = [10, 25, 50, 100, 250, 500]
+    # Per-worker cache of the facet counts, by filter
+    PRODUCT_FACETS_CACHE_TTL_SECONDS: int = 30
+    PRODUCT_FACETS_CACHE_MAX_SIZE: int = 1000
+    # Per-worker cache of /categories/tree, cleared by the worker's own writes
+    CATEGORY_TREE_CACHE_TTL_SECONDS: int = 60
+    # Fail requests that run more statements than their route's query budget
+    # instead of logging them, for tests
+    QUERY_BUDGET_STRICT: bool = False
+    # Make relationships loaded on access raise in request sessions
+    SQLALCHEMY_RAISE_ON_LAZY_LOAD: bool = False
+    # Statements running longer are logged, None turns the log off
+    SLOW_QUERY_THRESHOLD_MS: float | None = 500
+    # Share of the slow queries run again under EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    # EXPLAIN ANALYZE taking longer is cancelled, and a plain EXPLAIN without
+    # the actual timings is logged instead
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 5000
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -1,10 +1,121 @@
+from collections.abc import Callable, Sequence
+from typing import Any, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    with_metrics_prefix,
+)
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+_engine_options: dict[str, Any] = {
+    "pool_size": settings.POSTGRES_POOL_SIZE,
+    "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+    "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
+    "pool_recycle": settings.POSTGRES_POOL_RECYCLE,
+    "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,
+    "pool_use_lifo": settings.POSTGRES_POOL_USE_LIFO,
+    "query_cache_size": settings.SQLALCHEMY_COMPILED_CACHE_SIZE,
+    "connect_args": {
+        "prepare_threshold": settings.POSTGRES_PREPARE_THRESHOLD,
+        **settings.POSTGRES_CONNECT_ARGS,
+    },
+}
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedQueuePool,
+    **_engine_options,
+)
+# Same URL, SQLAlchemy picks psycopg's async driver for it
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedAsyncQueuePool,
+    **_engine_options,
+)
+# Read replicas, each with its own pools sized like the primary's
+replica_engines = [
+    create_engine(
+        uri,
+        poolclass=with_metrics_prefix(InstrumentedQueuePool, f"db_replica{i}_pool"),
+        **_engine_options,
+    )
+    for i, uri in enumerate(settings.POSTGRES_REPLICA_URIS)
+]
+replica_async_engines = [
+    create_async_engine(
+        uri,
+        poolclass=with_metrics_prefix(
+            InstrumentedAsyncQueuePool, f"db_replica{i}_async_pool"
+        ),
+        **_engine_options,
+    )
+    for i, uri in enumerate(settings.POSTGRES_REPLICA_URIS)
+]
+
+T = TypeVar("T")
+
+
+class ThreadedSession:
+    """
+    A sync Session behind the part of the AsyncSession interface the API
+    uses, every call that may hit the database runs in the threadpool.
+    Serves requests when POSTGRES_ASYNC_DRIVER is off.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.sync_session = session
+
+    def add(self, instance: object) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances: Sequence[object]) -> None:
+        self.sync_session.add_all(instances)
+
+    async def exec(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.exec, *args, **kwargs)
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.execute, *args, **kwargs)
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.scalar, *args, **kwargs)
+
+    async def get(self, entity: type[T], ident: Any, **kwargs: Any) -> T | None:
+        return await run_in_threadpool(
+            lambda: self.sync_session.get(entity, ident, **kwargs)
+        )
+
+    async def delete(self, instance: object) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance: object) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def connection(self, **kwargs: Any) -> Connection:
+        return await run_in_threadpool(self.sync_session.connection, **kwargs)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
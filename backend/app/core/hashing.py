@@ -0,0 +1,97 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+T = TypeVar("T")
+
+hash_queue_depth = registry.gauge(
+    "password_hash_queue_depth", "Hashing jobs waiting for a free worker process"
+)
+hash_in_flight = registry.gauge(
+    "password_hash_in_flight", "Hashing jobs running or waiting"
+)
+hash_latency = registry.histogram(
+    "password_hash_latency_seconds", "Time from submitting a hashing job to its result"
+)
+hash_rejected = registry.counter(
+    "password_hash_rejected_total", "Hashing jobs rejected because the queue was full"
+)
+
+
+class HashingQueueFull(Exception):
+    """
+    Raised when the password hashing executor can't accept more work.
+    """
+
+
+class PasswordHashingExecutor:
+    """
+    Runs password hashing in a pool of worker processes.
+
+    bcrypt is deliberately slow, so running it on the AnyIO threadpool lets a
+    burst of logins hold every thread. Here at most ``max_workers`` jobs run at
+    once (one per core by default), up to ``max_queue`` more wait for a free
+    process, and anything beyond that is rejected with ``HashingQueueFull``.
+    """
+
+    def __init__(self, *, max_workers: int | None = None, max_queue: int = 0) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self._pending - self.max_workers, 0)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Don't fork: the parent is running threads (threadpool, DB pool)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _update_gauges(self) -> None:
+        hash_in_flight.set(self._pending)
+        hash_queue_depth.set(self.queue_depth)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                hash_rejected.inc()
+                raise HashingQueueFull()
+            self._pending += 1
+            self._update_gauges()
+        start = time.perf_counter()
+        try:
+            future = self._get_pool().submit(fn, *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            hash_latency.observe(time.perf_counter() - start)
+            with self._lock:
+                self._pending -= 1
+                self._update_gauges()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+password_hasher = PasswordHashingExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
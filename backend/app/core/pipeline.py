@@ -0,0 +1,108 @@
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, cast
+
+import psycopg
+from fastapi.concurrency import run_in_threadpool
+from psycopg.rows import dict_row
+from sqlalchemy import ClauseElement, Connection, Dialect, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import ThreadedSession
+from app.core.query_stats import record_statement
+
+# A statement and its parameters
+Query = tuple[ClauseElement, dict[str, Any]]
+
+
+def to_driver(queries: Sequence[Query], dialect: Dialect) -> list[tuple[str, Any]]:
+    """
+    Compile ``queries`` to the SQL and parameters psycopg takes.
+    """
+    driver_queries = []
+    for statement, params in queries:
+        compiled = statement.compile(dialect=dialect)
+        driver_queries.append((str(compiled), compiled.construct_params(params)))
+    return driver_queries
+
+
+@contextmanager
+def _executing(db_engine: Engine, queries: list[tuple[str, Any]]) -> Iterator[None]:
+    """
+    Do what SQLAlchemy does around the statements it runs, which the pipeline
+    bypasses: raise driver errors as SQLAlchemy's, so a statement timeout
+    reaches the time budget handler, and count and log the statements.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except psycopg.Error as e:
+        statement = "; ".join(sql for sql, _ in queries)
+        raise DBAPIError.instance(statement, None, e, psycopg.Error) from e
+    # They share one round trip
+    duration = (time.perf_counter() - start) / len(queries)
+    for sql, params in queries:
+        record_statement(db_engine, sql, params, duration)
+
+
+def run_pipeline(
+    connection: psycopg.Connection[Any], queries: list[tuple[str, Any]]
+) -> list[list[dict[str, Any]]]:
+    """
+    Send every query before reading any result, in psycopg's pipeline mode.
+    """
+    with connection.pipeline():
+        cursors = [connection.cursor(row_factory=dict_row) for _ in queries]
+        for cursor, (sql, params) in zip(cursors, queries, strict=True):
+            cursor.execute(sql, params)
+    return [cursor.fetchall() for cursor in cursors]
+
+
+async def run_pipeline_async(
+    connection: psycopg.AsyncConnection[Any], queries: list[tuple[str, Any]]
+) -> list[list[dict[str, Any]]]:
+    async with connection.pipeline():
+        cursors = [connection.cursor(row_factory=dict_row) for _ in queries]
+        for cursor, (sql, params) in zip(cursors, queries, strict=True):
+            await cursor.execute(sql, params)
+    return [await cursor.fetchall() for cursor in cursors]
+
+
+def _pipelined_sync(
+    connection: Connection, queries: Sequence[Query]
+) -> list[list[dict[str, Any]]]:
+    driver_queries = to_driver(queries, connection.dialect)
+    driver_connection = cast(
+        psycopg.Connection[Any], connection.connection.driver_connection
+    )
+    with _executing(connection.engine, driver_queries):
+        results = run_pipeline(driver_connection, driver_queries)
+    return results
+
+
+async def pipelined(
+    session: AsyncSession, *queries: Query
+) -> list[list[dict[str, Any]]]:
+    """
+    Run independent read-only queries in one round trip, within the session's
+    transaction, and return the rows of each as dicts.
+
+    The statements go straight to psycopg, so rows of a ``select(Model)`` come
+    back as dicts rather than objects of the session.
+    """
+    # Binds to the replica when the request reads from one
+    bind_arguments = {"clause": queries[0][0]}
+    if isinstance(session, ThreadedSession):
+        sync_connection = await session.connection(bind_arguments=bind_arguments)
+        return await run_in_threadpool(_pipelined_sync, sync_connection, queries)
+    connection = await session.connection(bind_arguments=bind_arguments)
+    driver_queries = to_driver(queries, connection.dialect)
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = cast(
+        psycopg.AsyncConnection[Any], raw_connection.driver_connection
+    )
+    with _executing(connection.sync_engine, driver_queries):
+        results = await run_pipeline_async(driver_connection, driver_queries)
+    return results
@@ -0,0 +1,82 @@
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+
+from app.core.metrics import registry
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records checkout wait times, timeouts and usage in the
+    metrics registry, under names starting with ``metrics_prefix``.
+    """
+
+    metrics_prefix = "db_pool"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        prefix = self.metrics_prefix
+        self.checked_out_gauge = registry.gauge(
+            f"{prefix}_checked_out", "Connections currently in use"
+        )
+        self.overflow_gauge = registry.gauge(
+            f"{prefix}_overflow", "Connections open beyond the pool size"
+        )
+        self.wait_histogram = registry.histogram(
+            f"{prefix}_wait_seconds", "Time spent waiting to check out a connection"
+        )
+        self.timeouts_counter = registry.counter(
+            f"{prefix}_timeouts_total", "Checkouts that gave up after the pool timeout"
+        )
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts_counter.inc()
+            raise
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - start)
+        self._update_gauges()
+        return connection
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        self.checked_out_gauge.set(self.checkedout())
+        self.overflow_gauge.set(max(self.overflow(), 0))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "timeouts": self.timeouts_counter.value,
+            "wait_seconds": self.wait_histogram.snapshot(),
+        }
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """
+    Same for the pool of the async engine.
+    """
+
+    metrics_prefix = "db_async_pool"
+
+
+def with_metrics_prefix(
+    pool_class: type[InstrumentedQueuePool], prefix: str
+) -> type[InstrumentedQueuePool]:
+    """
+    Subclass of ``pool_class`` reporting under ``prefix``, so several engines
+    of the same kind don't share their metrics.
+    """
+    return type(pool_class.__name__, (pool_class,), {"metrics_prefix": prefix})
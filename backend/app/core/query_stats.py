@@ -0,0 +1,148 @@
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator, MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import ORMExecuteState, raiseload
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.routing import RoutingSession
+from app.core.slow_queries import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def route_name(scope: MutableMapping[str, Any]) -> str:
+    """
+    Method and path template of the route serving an ASGI request.
+    """
+    route = scope.get("route")
+    path = route.path if isinstance(route, APIRoute) else scope["path"]
+    return f"{scope['method']} {path}"
+
+
+@dataclass
+class QueryStats:
+    """
+    Statements a request ran, their total time and how often each SQL string
+    came up; the same string run many times usually means an N+1 query.
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+    # Statements the route declared it needs at most
+    budget: int | None = None
+    # Of the request, the route is only known once it has been routed
+    scope: MutableMapping[str, Any] | None = field(default=None, repr=False)
+
+    @property
+    def route(self) -> str | None:
+        return None if self.scope is None else route_name(self.scope)
+
+    @property
+    def duplicates(self) -> int:
+        return sum(n - 1 for n in self.shapes.values())
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement] += 1
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(
+    scope: MutableMapping[str, Any] | None = None,
+) -> Iterator[QueryStats]:
+    """
+    Count the statements run in this context, including in the threadpool
+    calls and tasks it starts, for the request of ``scope`` if given.
+    """
+    stats = QueryStats(scope=scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def check_query_budget(stats: QueryStats, route: str) -> None:
+    """
+    Log a route that ran more statements than its budget, or raise in
+    strict mode (QUERY_BUDGET_STRICT), which the tests run with.
+    """
+    if stats.budget is None or stats.count <= stats.budget:
+        return
+    message = (
+        f"{route} ran {stats.count} statements, its budget is {stats.budget}: "
+        + ", ".join(f"{n}x {statement}" for statement, n in stats.shapes.most_common(3))
+    )
+    if settings.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    registry.counter(
+        f'query_budget_exceeded_total{{route="{route}"}}',
+        "Requests that ran more statements than their route's budget",
+    ).inc()
+    logger.warning(message)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn: Any, *_args: Any) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(
+    conn: Any, _cursor: Any, statement: str, parameters: Any, *_args: Any
+) -> None:
+    if not conn.info.get("query_start"):
+        return
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    record_statement(conn.engine, statement, parameters, duration)
+
+
+def record_statement(
+    db_engine: Engine, statement: str, parameters: Any, duration: float
+) -> None:
+    """
+    Count a statement in the current request's stats and log it when slow.
+    Code running statements on the driver connection, which skips the
+    cursor events, calls it itself.
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    slow_query_log.observe(
+        db_engine,
+        statement,
+        parameters,
+        duration,
+        route=stats.route if stats is not None else None,
+    )
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _raise_on_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+    # Loading a relationship on access then raises instead of running a query
+    if settings.SQLALCHEMY_RAISE_ON_LAZY_LOAD and orm_execute_state.is_select:
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            raiseload("*")
+        )
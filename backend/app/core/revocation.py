@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+bloom_hits = registry.counter(
+    "token_revocation_bloom_hits_total",
+    "Token IDs found in the Bloom filter and checked against the database",
+)
+bloom_false_positives = registry.counter(
+    "token_revocation_bloom_false_positives_total",
+    "Bloom filter hits for tokens that were not revoked",
+)
+
+
+class BloomFilter:
+    """
+    Set membership test with no false negatives and a false positive rate of
+    about ``error_rate`` while it holds at most ``capacity`` items.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        # Double hashing: k positions derived from two 64-bit hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """
+    Per-worker Bloom filter over the ``revoked_token`` table.
+
+    Every ``refresh_interval`` seconds the filter is topped up from the
+    primary with the rows revoked since the last refresh, so revocations
+    made by another worker apply within that delay. Only a Bloom hit queries
+    the table; tokens that were never revoked cost no I/O.
+    """
+
+    # Re-read rows revoked shortly before the last refresh, in case their
+    # transaction committed after it ran
+    OVERLAP = timedelta(seconds=5)
+
+    def __init__(
+        self, *, capacity: int, error_rate: float, refresh_interval: float
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._loaded = False
+        self._last_revoked_at: datetime | None = None
+
+    def refresh(self, session: Session) -> None:
+        rebuild = not self._loaded or self._bloom.count >= self.capacity
+        statement = select(RevokedToken.jti, RevokedToken.revoked_at)
+        if rebuild:
+            # Start over with only the entries that haven't expired yet
+            statement = statement.where(RevokedToken.expires_at > datetime.utcnow())
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            last_revoked_at = None
+        else:
+            assert self._last_revoked_at is not None
+            statement = statement.where(
+                RevokedToken.revoked_at > self._last_revoked_at - self.OVERLAP
+            )
+            bloom = self._bloom
+            last_revoked_at = self._last_revoked_at
+        for jti, revoked_at in session.exec(statement):
+            if jti not in bloom:
+                bloom.add(jti)
+            if last_revoked_at is None or revoked_at > last_revoked_at:
+                last_revoked_at = revoked_at
+        self._bloom = bloom
+        self._loaded = True
+        self._last_revoked_at = last_revoked_at or datetime.utcnow() - self.OVERLAP
+
+    def add(self, jti: str) -> None:
+        self._bloom.add(jti)
+
+    async def is_revoked(self, session: AsyncSession, jti: str) -> bool:
+        # Until the first refresh, every token is checked against the table
+        if self._loaded and jti not in self._bloom:
+            return False
+        bloom_hits.inc()
+        revoked = await session.get(RevokedToken, jti) is not None
+        if not revoked:
+            bloom_false_positives.inc()
+        return revoked
+
+
+revocation_list = RevocationList(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    refresh_interval=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+)
+
+
+def refresh_revocation_list(db_engine: Engine) -> None:
+    """
+    Refresh the revocation list from ``db_engine``, the primary, outside of
+    any request. app.core.db can't be imported here, it imports the CRUD
+    modules, which use the revocation list.
+    """
+    try:
+        with Session(db_engine) as session:
+            revocation_list.refresh(session)
+    except Exception:
+        logger.exception("Failed to refresh the token revocation list")
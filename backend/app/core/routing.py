@@ -0,0 +1,147 @@
+import random
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Protocol
+
+from sqlalchemy import Engine, Select, event
+from sqlalchemy.sql.dml import UpdateBase
+from sqlmodel import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import registry
+
+replica_reads = registry.counter(
+    "db_replica_reads_total", "Statements sent to a read replica"
+)
+replica_pinned = registry.counter(
+    "db_replica_pinned_requests_total",
+    "Read-only requests served by the primary because the user just wrote",
+)
+
+
+class RoutingSession(Session):
+    """
+    Session bound to the primary that sends SELECTs to the replica in
+    ``info["replica"]``, if any. Flushes and other statements always go to
+    the primary; once a write commits, the user in ``info["user_id"]`` reads
+    from the primary for a while.
+    """
+
+    def get_bind(self, mapper: Any = None, **kw: Any) -> Any:
+        replica: Engine | None = self.info.get("replica")
+        clause = kw.get("clause")
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        elif replica is not None and isinstance(clause, Select):
+            replica_reads.inc()
+            return replica
+        return super().get_bind(mapper, **kw)
+
+
+@contextmanager
+def read_from_primary(session: Session) -> Iterator[None]:
+    """
+    Send the reads of ``session`` to the primary within the block. For results
+    kept past the request, such as the per-worker caches, which a lagging
+    replica would otherwise fill with stale rows.
+    """
+    replica = session.info.pop("replica", None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            session.info["replica"] = replica
+
+
+def pick_replica(engines: list[Any]) -> Any | None:
+    return random.choice(engines) if engines else None
+
+
+class PinStore(Protocol):
+    async def add(self, key: str, ttl: float) -> None: ...
+
+    async def contains(self, key: str) -> bool: ...
+
+
+class MemoryPinStore:
+    """
+    Per-process store, a request served by another worker right after a write
+    may still read from a replica.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self._pins: TTLCache[str, bool] = TTLCache(
+            "replica_pin", maxsize=maxsize, ttl=0
+        )
+
+    async def add(self, key: str, ttl: float) -> None:
+        self._pins.set(key, True, ttl=ttl)
+
+    async def contains(self, key: str) -> bool:
+        return self._pins.get(key) is not None
+
+
+class RedisPinStore:
+    """
+    Store shared by every worker, one expiring key per pinned user.
+    """
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis.asyncio as redis  # type: ignore
+        except ImportError:
+            raise RuntimeError(
+                "REPLICA_PIN_REDIS_URL is set but the redis package is not installed"
+            )
+        self._client: Any = redis.Redis.from_url(url)
+
+    async def add(self, key: str, ttl: float) -> None:
+        await self._client.set(key, 1, px=max(int(ttl * 1000), 1))
+
+    async def contains(self, key: str) -> bool:
+        return bool(await self._client.exists(key))
+
+
+class ReplicaPins:
+    """
+    Users who wrote recently, whose reads must go to the primary.
+    """
+
+    def __init__(self, store: PinStore, *, ttl: float) -> None:
+        self.store = store
+        self.ttl = ttl
+
+    async def pin(self, user_id: str) -> None:
+        await self.store.add(f"replica-pin:{user_id}", self.ttl)
+
+    async def pin_writer(self, info: dict[str, Any]) -> None:
+        """
+        Pin the user of a session, given its ``info``, if it committed a write.
+        """
+        user_id = info.get("user_id")
+        if info.pop("committed_write", False) and user_id is not None:
+            await self.pin(user_id)
+
+    async def is_pinned(self, user_id: str) -> bool:
+        if await self.store.contains(f"replica-pin:{user_id}"):
+            replica_pinned.inc()
+            return True
+        return False
+
+
+def _get_store() -> PinStore:
+    if settings.REPLICA_PIN_REDIS_URL:
+        return RedisPinStore(settings.REPLICA_PIN_REDIS_URL)
+    return MemoryPinStore()
+
+
+replica_pins = ReplicaPins(_get_store(), ttl=settings.REPLICA_PIN_SECONDS)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _note_committed_write(session: Session) -> None:
+    # The store may be over the network, so the user is pinned when the
+    # request's session closes, see ReplicaPins.pin_writer
+    if session.info.pop("wrote", False):
+        session.info["committed_write"] = True
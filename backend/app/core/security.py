@@ -1,3 +1,7 @@
+import hashlib
+import hmac
+import secrets
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -5,23 +9,107 @@ import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.hashing import password_hasher
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 ALGORITHM = "HS256"
 
+API_KEY_PREFIX = "ek"
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    claims: dict[str, Any] | None = None,
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {
+        **(claims or {}),
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid.uuid4().hex,
+    }
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def principal_claims(
+    *, is_active: bool, is_superuser: bool, token_version: int
+) -> dict[str, Any]:
+    """
+    Claims that let a route authorize the token without loading the user row.
+    """
+    return {"act": is_active, "su": is_superuser, "ver": token_version}
+
+
+def hash_token(token: str) -> str:
+    """
+    Digest for opaque, high-entropy tokens stored at rest. They don't need a
+    slow hash like passwords do, HMAC keeps a leaked table useless without
+    SECRET_KEY.
+    """
+    return hmac.new(
+        settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def generate_api_key() -> tuple[str, str, str]:
+    """
+    Return a new API key, its lookup prefix and the digest of its secret.
+    """
+    prefix = secrets.token_hex(6)
+    secret = secrets.token_urlsafe(32)
+    return f"{API_KEY_PREFIX}_{prefix}_{secret}", prefix, hash_api_key_secret(secret)
+
+
+def split_api_key(api_key: str) -> tuple[str, str] | None:
+    """
+    Split an API key into its prefix and secret, or None if it's malformed.
+    """
+    parts = api_key.split("_", 2)
+    if len(parts) != 3 or parts[0] != API_KEY_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1], parts[2]
+
+
+def hash_api_key_secret(secret: str) -> str:
+    # Random 256-bit secrets, a single SHA-256 is enough to store them
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify the password and, if its hash uses outdated settings (e.g. a
+    different BCRYPT_ROUNDS), also return a new hash to store.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return await password_hasher.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
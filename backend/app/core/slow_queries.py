@@ -0,0 +1,208 @@
+import logging
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import URL, Engine, NullPool, create_engine
+from sqlalchemy.exc import DBAPIError
+
+from app.core.budgets import is_statement_timeout
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+slow_queries_total = registry.counter(
+    "db_slow_queries_total", "Statements that ran longer than the slow query threshold"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists render one placeholder per value
+_IN_LIST = re.compile(r"IN \((?:%\(\w+\)s(?:, )?)+\)")
+_QUERY = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """
+    Names and types of the bound parameters, never their values.
+    """
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        if parameters and isinstance(parameters[0], dict | list | tuple):
+            # executemany
+            return [parameter_shape(parameters[0]), f"x{len(parameters)}"]
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+@dataclass
+class SlowQuery:
+    route: str | None
+    statement: str
+    parameters: Any
+    duration_ms: float
+    recorded_at: datetime = field(default_factory=datetime.utcnow)
+    # EXPLAIN (ANALYZE, BUFFERS) output, for the sampled queries. Plain
+    # EXPLAIN output if that ran past the explain timeout
+    plan: str | None = None
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than ``threshold_ms`` and keeps the latest ones.
+
+    A ``sample_rate`` share of the slow queries is run again under
+    ``EXPLAIN (ANALYZE, BUFFERS)`` in a background thread, and the plan is
+    logged with them. It runs on the database that ran the query, on a
+    connection of its own outside the request's pool, in a read-only
+    transaction. Past ``explain_timeout_ms`` it is cancelled and the plan
+    comes from a plain EXPLAIN instead.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold_ms: float | None,
+        sample_rate: float,
+        explain_timeout_ms: int,
+        max_entries: int = 100,
+        max_pending_explains: int = 4,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.explain_timeout_ms = explain_timeout_ms
+        self.max_pending_explains = max_pending_explains
+        self.recent: deque[SlowQuery] = deque(maxlen=max_entries)
+        self._pending: set[Future[None]] = set()
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        # Of the EXPLAINs, by URL of the database that ran the query
+        self._engines: dict[URL, Engine] = {}
+
+    def observe(
+        self,
+        conn_engine: Engine,
+        statement: str,
+        parameters: Any,
+        duration: float,
+        route: str | None,
+    ) -> None:
+        duration_ms = duration * 1000
+        if (
+            self.threshold_ms is None
+            or duration_ms < self.threshold_ms
+            or self._engines.get(conn_engine.url) is conn_engine
+        ):
+            return
+        slow_query = SlowQuery(
+            route=route,
+            statement=normalize_sql(statement),
+            parameters=parameter_shape(parameters),
+            duration_ms=round(duration_ms, 2),
+        )
+        self.recent.append(slow_query)
+        slow_queries_total.inc()
+        logger.warning(
+            "Slow query on %s, %.1f ms: %s %s",
+            route or "no route",
+            duration_ms,
+            slow_query.statement,
+            slow_query.parameters,
+        )
+        if _QUERY.match(statement) and random.random() < self.sample_rate:
+            self._submit_explain(conn_engine.url, slow_query, statement, parameters)
+
+    def _submit_explain(
+        self, url: URL, slow_query: SlowQuery, statement: str, parameters: Any
+    ) -> None:
+        with self._lock:
+            if len(self._pending) >= self.max_pending_explains:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="explain"
+                )
+            engine = self._engines.get(url)
+            if engine is None:
+                engine = self._engines[url] = create_engine(url, poolclass=NullPool)
+            future = self._executor.submit(
+                self._explain, engine, slow_query, statement, parameters
+            )
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future[None]) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def _explain(
+        self, engine: Engine, slow_query: SlowQuery, statement: str, parameters: Any
+    ) -> None:
+        try:
+            with engine.connect() as connection:
+                # ANALYZE runs the statement, never keep what it did
+                with connection.begin() as transaction:
+                    connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                    connection.exec_driver_sql(
+                        f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}"
+                    )
+                    try:
+                        with connection.begin_nested():
+                            rows = connection.exec_driver_sql(
+                                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                            ).all()
+                    except DBAPIError as e:
+                        if not is_statement_timeout(e):
+                            raise
+                        rows = connection.exec_driver_sql(
+                            f"EXPLAIN {statement}", parameters
+                        ).all()
+                    transaction.rollback()
+        except Exception:
+            logger.warning("Could not explain %s", slow_query.statement, exc_info=True)
+            return
+        slow_query.plan = "\n".join(row[0] for row in rows)
+        logger.warning(
+            "Plan of slow query on %s: %s\n%s",
+            slow_query.route or "no route",
+            slow_query.statement,
+            slow_query.plan,
+        )
+
+    def wait(self) -> None:
+        """
+        Block until the EXPLAINs submitted so far are done.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result()
+
+    def entries(self) -> list[dict[str, Any]]:
+        return [asdict(slow_query) for slow_query in reversed(self.recent)]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            engines, self._engines = self._engines, {}
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for engine in engines.values():
+            engine.dispose()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    explain_timeout_ms=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS,
+)
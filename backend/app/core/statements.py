@@ -0,0 +1,53 @@
+import logging
+from typing import Any, TypeVar
+
+from sqlalchemy import Connection, Engine, Executable
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+StatementType = TypeVar("StatementType", bound=Executable)
+
+_cached_statements: list[tuple[Executable, dict[str, Any]]] = []
+
+
+def cached_statement(statement: StatementType, **warm_params: Any) -> StatementType:
+    """
+    Register a module-level statement of a hot query, built once with bind
+    parameters instead of per request. It gets compiled at startup, executed
+    with ``warm_params``, so the first requests find it in the engine's
+    compiled cache.
+    """
+    _cached_statements.append((statement, warm_params))
+    return statement
+
+
+def _warm(connection: Connection) -> int:
+    with connection.begin() as transaction:
+        # Warming up must not hold up startup on a large table
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(settings.DB_TIME_BUDGET_MS)}"
+        )
+        for statement, params in _cached_statements:
+            try:
+                with connection.begin_nested():
+                    connection.execute(statement, params)
+            except Exception:
+                logger.warning("Could not warm up %s", statement, exc_info=True)
+        transaction.rollback()
+    return len(_cached_statements)
+
+
+def warm_compiled_cache(engine: Engine) -> int:
+    """
+    Compile every cached statement into ``engine``'s cache, returns how many.
+    """
+    with engine.connect() as connection:
+        return _warm(connection)
+
+
+async def warm_compiled_cache_async(engine: AsyncEngine) -> int:
+    async with engine.connect() as connection:
+        return await connection.run_sync(_warm)
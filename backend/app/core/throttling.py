@@ -0,0 +1,207 @@
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Protocol
+
+from fastapi import Request
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import registry
+
+login_throttled = registry.counter(
+    "login_throttled_total", "Login attempts rejected by the failure throttle"
+)
+
+
+class ThrottleStore(Protocol):
+    """
+    Keeps the timestamps of recent failures per key.
+    """
+
+    async def add(self, key: str, now: float, window: float) -> None: ...
+
+    async def get(self, key: str, now: float, window: float) -> list[float]: ...
+
+    async def clear(self, key: str) -> None: ...
+
+
+class MemoryThrottleStore:
+    """
+    Per-process store. With several workers each one counts on its own, so
+    the effective limit is multiplied by the number of workers.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, deque[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def add(self, key: str, now: float, window: float) -> None:
+        with self._lock:
+            timestamps = self._data.setdefault(key, deque())
+            timestamps.append(now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._expire(timestamps, now, window)
+
+    async def get(self, key: str, now: float, window: float) -> list[float]:
+        with self._lock:
+            timestamps = self._data.get(key)
+            if timestamps is None:
+                return []
+            self._expire(timestamps, now, window)
+            if not timestamps:
+                del self._data[key]
+            return list(timestamps)
+
+    async def clear(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    @staticmethod
+    def _expire(timestamps: deque[float], now: float, window: float) -> None:
+        while timestamps and timestamps[0] <= now - window:
+            timestamps.popleft()
+
+
+class RedisThrottleStore:
+    """
+    Store shared by every worker, one sorted set of timestamps per key.
+    """
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis.asyncio as redis  # type: ignore
+        except ImportError:
+            raise RuntimeError(
+                "LOGIN_THROTTLE_REDIS_URL is set but the redis package is not installed"
+            )
+        self._client: Any = redis.Redis.from_url(url)
+
+    async def add(self, key: str, now: float, window: float) -> None:
+        pipe = self._client.pipeline()
+        pipe.zadd(key, {repr(now): now})
+        pipe.zremrangebyscore(key, "-inf", now - window)
+        pipe.expire(key, math.ceil(window))
+        await pipe.execute()
+
+    async def get(self, key: str, now: float, window: float) -> list[float]:
+        pipe = self._client.pipeline()
+        pipe.zremrangebyscore(key, "-inf", now - window)
+        pipe.zrange(key, 0, -1, withscores=True)
+        _, entries = await pipe.execute()
+        return [score for _, score in entries]
+
+    async def clear(self, key: str) -> None:
+        await self._client.delete(key)
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    for trusted in settings.FORWARDED_ALLOW_IPS:
+        if trusted in ("*", host):
+            return True
+        try:
+            if ipaddress.ip_address(host) in ipaddress.ip_network(
+                trusted, strict=False
+            ):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def client_ip(request: Request) -> str | None:
+    """
+    Address of the client that sent ``request``. Behind the proxies in
+    FORWARDED_ALLOW_IPS, it is the last X-Forwarded-For entry that isn't one
+    of them: the entries before it can be set by the client itself.
+    """
+    host = request.client.host if request.client else None
+    if host is None or not _is_trusted_proxy(host):
+        return host
+    forwarded = request.headers.get("X-Forwarded-For", "").split(",")
+    for entry in reversed([entry.strip() for entry in forwarded if entry.strip()]):
+        host = entry
+        if not _is_trusted_proxy(entry):
+            break
+    return host
+
+
+class LoginThrottle:
+    """
+    Sliding-window counter of failed logins per account and per client IP.
+
+    Once a key is over its limit the lockout is also remembered locally, so
+    repeated attempts are rejected without touching the store, the database
+    or bcrypt.
+    """
+
+    def __init__(
+        self,
+        store: ThrottleStore,
+        *,
+        window: float,
+        max_failures_per_account: int,
+        max_failures_per_ip: int,
+    ) -> None:
+        self.store = store
+        self.window = window
+        self.max_failures_per_account = max_failures_per_account
+        self.max_failures_per_ip = max_failures_per_ip
+        self._locked: TTLCache[str, float] = TTLCache(
+            "login_lockout", maxsize=100_000, ttl=window
+        )
+
+    def _keys(self, email: str, ip: str | None) -> list[tuple[str, int]]:
+        keys = [(f"login:account:{email.lower()}", self.max_failures_per_account)]
+        if ip:
+            keys.append((f"login:ip:{ip}", self.max_failures_per_ip))
+        return keys
+
+    async def retry_after(self, *, email: str, ip: str | None) -> float | None:
+        """
+        Seconds until a login for ``email`` from ``ip`` is allowed again, or
+        None if it is allowed now.
+        """
+        now = time.time()
+        for key, limit in self._keys(email, ip):
+            locked_until = self._locked.get(key)
+            if locked_until is None:
+                failures = await self.store.get(key, now, self.window)
+                if len(failures) < limit:
+                    continue
+                # Locked until enough failures have left the window
+                locked_until = failures[-limit] + self.window
+                self._locked.set(key, locked_until, ttl=locked_until - now)
+            if locked_until > now:
+                login_throttled.inc()
+                return locked_until - now
+        return None
+
+    async def record_failure(self, *, email: str, ip: str | None) -> None:
+        now = time.time()
+        for key, _ in self._keys(email, ip):
+            await self.store.add(key, now, self.window)
+
+    async def reset(self, *, email: str) -> None:
+        key = f"login:account:{email.lower()}"
+        await self.store.clear(key)
+        self._locked.invalidate(key)
+
+
+def _get_store() -> ThrottleStore:
+    if settings.LOGIN_THROTTLE_REDIS_URL:
+        return RedisThrottleStore(settings.LOGIN_THROTTLE_REDIS_URL)
+    return MemoryThrottleStore()
+
+
+login_throttle = LoginThrottle(
+    _get_store(),
+    window=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+    max_failures_per_account=settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT,
+    max_failures_per_ip=settings.LOGIN_THROTTLE_MAX_FAILURES_PER_IP,
+)
@@ -1 +1,79 @@
-from . import crud_user, crud_item, crud_product
+from . import (
+    crud_api_key,
+    crud_category,
+    crud_user,
+    crud_item,
+    crud_product,
+    crud_refresh_token,
+    crud_revoked_token,
+)
+from .crud_api_key import (
+    create_api_key,
+    create_api_key_async,
+    get_active_api_key_by_prefix,
+    get_active_api_key_by_prefix_async,
+    revoke_api_key,
+    revoke_api_key_async,
+)
+from .crud_item import create_item, create_item_async
+from .crud_refresh_token import (
+    create_refresh_token,
+    create_refresh_token_async,
+    get_refresh_token,
+    get_refresh_token_async,
+    mark_refresh_token_used,
+    mark_refresh_token_used_async,
+    revoke_refresh_token_family,
+    revoke_refresh_token_family_async,
+    revoke_user_refresh_tokens,
+    revoke_user_refresh_tokens_async,
+)
+from .crud_revoked_token import revoke_access_token, revoke_access_token_async
+from .crud_user import (
+    authenticate,
+    authenticate_async,
+    create_user,
+    create_user_async,
+    get_user_by_email,
+    get_user_by_email_async,
+    update_user,
+    update_user_async,
+)
+
+__all__ = [
+    "crud_api_key",
+    "crud_category",
+    "crud_user",
+    "crud_item",
+    "crud_product",
+    "crud_refresh_token",
+    "crud_revoked_token",
+    "create_api_key",
+    "create_api_key_async",
+    "get_active_api_key_by_prefix",
+    "get_active_api_key_by_prefix_async",
+    "revoke_api_key",
+    "revoke_api_key_async",
+    "create_item",
+    "create_item_async",
+    "create_refresh_token",
+    "create_refresh_token_async",
+    "get_refresh_token",
+    "get_refresh_token_async",
+    "mark_refresh_token_used",
+    "mark_refresh_token_used_async",
+    "revoke_refresh_token_family",
+    "revoke_refresh_token_family_async",
+    "revoke_user_refresh_tokens",
+    "revoke_user_refresh_tokens_async",
+    "revoke_access_token",
+    "revoke_access_token_async",
+    "authenticate",
+    "authenticate_async",
+    "create_user",
+    "create_user_async",
+    "get_user_by_email",
+    "get_user_by_email_async",
+    "update_user",
+    "update_user_async",
+]
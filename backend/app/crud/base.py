@@ -1,40 +1,228 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any, Generic, Literal, TypeVar
+
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel
-from sqlmodel import SQLModel, Session, select
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import ColumnElement, bindparam, tuple_
+from sqlalchemy.orm import class_mapper
+from sqlmodel import Session, SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+FilterOp = Literal["eq", "gte", "lte"]
+
+
+@dataclass(frozen=True)
+class Filter:
+    """
+    Query parameter of list endpoints comparing ``column`` with its value.
+    """
+
+    column: str
+    op: FilterOp = "eq"
+
+
+class UnsupportedQuery(ValueError):
+    pass
+
+
+@dataclass
+class ListQuery:
+    """
+    Filters and order of a list, as compiled by ``CRUDBase.list_query``.
+    """
+
+    where: list[ColumnElement[bool]]
+    pk: Any
+    # Column sorted on before the primary key, None to sort on the key alone
+    sort: Any = None
+    sort_type: Any = None
+    descending: bool = False
+    # The filter parameters that were set and their values, sorted
+    filters: tuple[tuple[str, Any], ...] = ()
+
+    @property
+    def is_default(self) -> bool:
+        return not self.where and self.sort is None
+
+    def order_by(self) -> list[Any]:
+        columns = [self.pk] if self.sort is None else [self.sort, self.pk]
+        return [column.desc() if self.descending else column for column in columns]
+
+    def after(self) -> ColumnElement[bool]:
+        """
+        Rows after the ``:after`` key and ``:after_key`` sort value of the
+        last row of the previous page.
+        """
+        if self.sort is None:
+            return self.pk > bindparam("after")  # type: ignore[no-any-return]
+        row = tuple_(self.sort, self.pk)
+        last = tuple_(bindparam("after_key", type_=self.sort.type), bindparam("after"))
+        return row < last if self.descending else row > last
+
+    def sort_key(self, row: Any) -> Any:
+        return None if self.sort is None else getattr(row, self.sort.key)
+
+    def parse_sort_key(self, value: Any) -> Any:
+        try:
+            return TypeAdapter(self.sort_type).validate_python(value)
+        except ValidationError:
+            raise UnsupportedQuery("Invalid cursor")
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: type[ModelType],
+        *,
+        filters: dict[str, Filter] | None = None,
+        sorts: Sequence[str] = (),
+    ):
+        """
+        ``filters`` maps the query parameters lists can be filtered with to
+        their filter, and ``sorts`` names the columns they can be sorted on.
+        Each sort column has to be in an index of the model.
+        """
         self.model = model
+        self.filters = filters or {}
+        self.sorts = tuple(sorts)
+        table: Any = class_mapper(model).local_table
+        self._columns = table.columns
+        (self._pk,) = class_mapper(model).primary_key
+        self._indexes = [[self._pk.name]] + [
+            [column.name for column in index.columns] for index in table.indexes
+        ]
+        for name in self.sorts:
+            column = table.columns[name]
+            if column.nullable or not any(name in i for i in self._indexes):
+                raise ValueError(
+                    f"{model.__name__} can't be sorted on {name}, it has to be "
+                    "an indexed column without nulls"
+                )
+        for spec in self.filters.values():
+            if spec.column not in table.columns:
+                raise ValueError(f"{model.__name__} has no column {spec.column}")
+
+    def filter_type(self, param: str) -> Any:
+        """
+        Type of the value of the ``param`` filter.
+        """
+        spec = self.filters[param]
+        return self.model.model_fields[spec.column].annotation
+
+    def _index_backed(self, equal: set[str], order: str) -> bool:
+        # The index has to return rows in ``order`` once its leading
+        # columns are fixed by equality filters
+        for columns in self._indexes:
+            rest = list(columns)
+            while rest and rest[0] != order and rest[0] in equal:
+                rest.pop(0)
+            if rest and rest[0] == order:
+                return True
+        return False
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
+    def list_query(self, params: Mapping[str, Any], sort: str | None) -> ListQuery:
+        """
+        Compile filter query parameters and a sort column, prefixed with ``-``
+        for descending order, into a ``ListQuery``. Raises
+        ``UnsupportedQuery`` unless an index of the model returns the rows in
+        order.
+        """
+        descending = sort is not None and sort.startswith("-")
+        sort_name = sort.removeprefix("-") if sort is not None else None
+        if sort_name is not None and sort_name not in self.sorts:
+            raise UnsupportedQuery(
+                f"Can't sort on {sort_name}, only on: {', '.join(self.sorts)}"
+            )
+        order = sort_name or self._pk.name
+        where = []
+        equal = set()
+        filters = []
+        for param, value in sorted(params.items()):
+            if value is None:
+                continue
+            spec = self.filters[param]
+            filters.append((param, value))
+            column = col(getattr(self.model, spec.column))
+            if spec.op == "eq":
+                where.append(column == value)
+                equal.add(spec.column)
+            else:
+                # A range is only read from the index the rows are sorted by
+                if spec.column != order:
+                    raise UnsupportedQuery(
+                        f"Filtering on {param} requires sort={spec.column}"
+                    )
+                where.append(column >= value if spec.op == "gte" else column <= value)
+        if not self._index_backed(equal, order):
+            prefix = next(c[: c.index(order)] for c in self._indexes if order in c)
+            raise UnsupportedQuery(
+                f"Sorting on {order} requires filtering on {', '.join(prefix)}"
+            )
+        if sort_name is None:
+            return ListQuery(where=where, pk=self._pk, filters=tuple(filters))
+        return ListQuery(
+            where=where,
+            pk=self._pk,
+            sort=self._columns[sort_name],
+            sort_type=self.model.model_fields[sort_name].annotation,
+            descending=descending,
+            filters=tuple(filters),
+        )
+
+    def get(self, db: Session, id: Any) -> ModelType | None:
         return db.get(self.model, id)
 
+    async def get_async(self, db: AsyncSession, id: Any) -> ModelType | None:
+        return await db.get(self.model, id)
+
+    def _multi_statement(
+        self, skip: int, limit: int, after: Any
+    ) -> SelectOfScalar[ModelType]:
+        # Ordered by primary key, so pages are stable and ``after`` (the key of
+        # the last row of the previous page) can replace a deep offset
+        (pk,) = class_mapper(self.model).primary_key
+        stmt = select(self.model).order_by(pk).limit(limit)
+        if after is not None:
+            return stmt.where(pk > after)
+        return stmt.offset(skip)
+
     def get_multi(
-        self, db: Session, skip: int = 0, limit: int = 100
-    ) -> List[ModelType]:
-        stmt = select(self.model).offset(skip).limit(limit)
-        return db.exec(stmt).all()
+        self, db: Session, skip: int = 0, limit: int = 100, after: Any = None
+    ) -> list[ModelType]:
+        return list(db.exec(self._multi_statement(skip, limit, after)).all())
+
+    async def get_multi_async(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Any = None
+    ) -> list[ModelType]:
+        return list((await db.exec(self._multi_statement(skip, limit, after))).all())
 
     def create(self, db: Session, obj_in: CreateSchemaType) -> ModelType:
         obj_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_data)  # type: ignore
+        db_obj = self.model(**obj_data)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
-    def update(
-        self,
-        db: Session,
-        db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    async def create_async(
+        self, db: AsyncSession, obj_in: CreateSchemaType
     ) -> ModelType:
+        obj_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    def _apply_update(
+        self, db_obj: ModelType, obj_in: UpdateSchemaType | dict[str, Any]
+    ) -> None:
         obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
@@ -43,15 +231,43 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         for field in obj_data:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
+
+    def update(
+        self,
+        db: Session,
+        db_obj: ModelType,
+        obj_in: UpdateSchemaType | dict[str, Any],
+    ) -> ModelType:
+        self._apply_update(db_obj, obj_in)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
-    def remove(self, db: Session, id: Any) -> ModelType:
+    async def update_async(
+        self,
+        db: AsyncSession,
+        db_obj: ModelType,
+        obj_in: UpdateSchemaType | dict[str, Any],
+    ) -> ModelType:
+        self._apply_update(db_obj, obj_in)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    def remove(self, db: Session, id: Any) -> ModelType | None:
         obj = db.get(self.model, id)
         if obj is None:
             return None  # optional safety
         db.delete(obj)
         db.commit()
         return obj
+
+    async def remove_async(self, db: AsyncSession, id: Any) -> ModelType | None:
+        obj = await db.get(self.model, id)
+        if obj is None:
+            return None  # optional safety
+        await db.delete(obj)
+        await db.commit()
+        return obj
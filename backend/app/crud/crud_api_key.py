@@ -0,0 +1,84 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
+
+from app.core.security import generate_api_key
+from app.models import ApiKey, ApiKeyCreate, User
+
+
+def _new_api_key(api_key_in: ApiKeyCreate, owner_id: uuid.UUID) -> tuple[ApiKey, str]:
+    key, prefix, secret_hash = generate_api_key()
+    db_obj = ApiKey.model_validate(
+        api_key_in,
+        update={"prefix": prefix, "secret_hash": secret_hash, "owner_id": owner_id},
+    )
+    return db_obj, key
+
+
+def create_api_key(
+    *, session: Session, api_key_in: ApiKeyCreate, owner_id: uuid.UUID
+) -> tuple[ApiKey, str]:
+    """
+    Store a new API key and return it with the full key, which is not
+    persisted and can't be retrieved later.
+    """
+    db_obj, key = _new_api_key(api_key_in, owner_id)
+    session.add(db_obj)
+    session.commit()
+    session.refresh(db_obj)
+    return db_obj, key
+
+
+async def create_api_key_async(
+    *, session: AsyncSession, api_key_in: ApiKeyCreate, owner_id: uuid.UUID
+) -> tuple[ApiKey, str]:
+    db_obj, key = _new_api_key(api_key_in, owner_id)
+    session.add(db_obj)
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj, key
+
+
+def _active_api_key_statement(prefix: str) -> Select[tuple[ApiKey, User]]:
+    return (
+        select(ApiKey, User)
+        .join(User, col(ApiKey.owner_id) == User.id)
+        .where(ApiKey.prefix == prefix)
+        .where(col(ApiKey.revoked_at).is_(None))
+    )
+
+
+def get_active_api_key_by_prefix(
+    *, session: Session, prefix: str
+) -> tuple[ApiKey, User] | None:
+    """
+    The unrevoked key with this prefix together with its owner.
+    """
+    row = session.exec(_active_api_key_statement(prefix)).first()
+    return (row[0], row[1]) if row else None
+
+
+async def get_active_api_key_by_prefix_async(
+    *, session: AsyncSession, prefix: str
+) -> tuple[ApiKey, User] | None:
+    row = (await session.exec(_active_api_key_statement(prefix))).first()
+    return (row[0], row[1]) if row else None
+
+
+def revoke_api_key(*, session: Session, db_api_key: ApiKey) -> ApiKey:
+    db_api_key.revoked_at = datetime.utcnow()
+    session.add(db_api_key)
+    session.commit()
+    session.refresh(db_api_key)
+    return db_api_key
+
+
+async def revoke_api_key_async(*, session: AsyncSession, db_api_key: ApiKey) -> ApiKey:
+    db_api_key.revoked_at = datetime.utcnow()
+    session.add(db_api_key)
+    await session.commit()
+    await session.refresh(db_api_key)
+    return db_api_key
@@ -0,0 +1,334 @@
+import uuid
+from typing import Any
+
+from sqlalchemy import (
+    Delete,
+    Insert,
+    Select,
+    Uuid,
+    bindparam,
+    insert,
+    literal,
+    true,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, col, delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.statements import cached_statement
+from app.models import (
+    Category,
+    CategoryClosure,
+    CategoryCreate,
+    CategoryTree,
+    CategoryUpdate,
+    Product,
+)
+
+
+class CategoryCycle(ValueError):
+    pass
+
+
+def _add_paths_statement(category_id: uuid.UUID, parent_id: uuid.UUID | None) -> Insert:
+    # The new category is its own descendant, and one level further than
+    # the parent from each of the parent's ancestors
+    id_value = literal(category_id, Uuid)
+    paths: Any = select(id_value, id_value, literal(0))
+    if parent_id is not None:
+        paths = union_all(
+            select(
+                col(CategoryClosure.ancestor_id),
+                id_value,
+                col(CategoryClosure.depth) + 1,
+            ).where(col(CategoryClosure.descendant_id) == parent_id),
+            paths,
+        )
+    return insert(CategoryClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"], paths
+    )
+
+
+def _subtree(category_id: uuid.UUID) -> Any:
+    return select(col(CategoryClosure.descendant_id)).where(
+        col(CategoryClosure.ancestor_id) == category_id
+    )
+
+
+def _detach_statement(category_id: uuid.UUID) -> Delete:
+    # Paths from the category's ancestors, not itself, into its subtree
+    ancestors = select(col(CategoryClosure.ancestor_id)).where(
+        col(CategoryClosure.descendant_id) == category_id,
+        col(CategoryClosure.ancestor_id) != category_id,
+    )
+    return delete(CategoryClosure).where(
+        col(CategoryClosure.descendant_id).in_(_subtree(category_id)),
+        col(CategoryClosure.ancestor_id).in_(ancestors),
+    )
+
+
+def _attach_statement(category_id: uuid.UUID, parent_id: uuid.UUID) -> Insert:
+    # Each ancestor of the new parent to each category of the subtree
+    above = aliased(CategoryClosure)
+    below = aliased(CategoryClosure)
+    paths = (
+        select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+        .select_from(above)
+        .join(below, true())
+        .where(above.descendant_id == parent_id, below.ancestor_id == category_id)
+    )
+    return insert(CategoryClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"], paths
+    )
+
+
+def _cycle_statement(category_id: uuid.UUID, parent_id: uuid.UUID) -> Any:
+    return select(col(CategoryClosure.depth)).where(
+        col(CategoryClosure.ancestor_id) == category_id,
+        col(CategoryClosure.descendant_id) == parent_id,
+    )
+
+
+def _new_parent(db_obj: Category, obj_in: CategoryUpdate) -> bool:
+    return (
+        "parent_id" in obj_in.model_fields_set and obj_in.parent_id != db_obj.parent_id
+    )
+
+
+def create_category(*, session: Session, category_in: CategoryCreate) -> Category:
+    """
+    Store a category with its closure rows, in one transaction.
+    """
+    db_obj = Category.model_validate(category_in)
+    session.add(db_obj)
+    session.flush()
+    session.exec(_add_paths_statement(db_obj.id, db_obj.parent_id))  # type: ignore
+    session.commit()
+    session.refresh(db_obj)
+    return db_obj
+
+
+async def create_category_async(
+    *, session: AsyncSession, category_in: CategoryCreate
+) -> Category:
+    db_obj = Category.model_validate(category_in)
+    session.add(db_obj)
+    await session.flush()
+    await session.exec(_add_paths_statement(db_obj.id, db_obj.parent_id))  # type: ignore
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj
+
+
+def update_category(
+    *, session: Session, db_obj: Category, obj_in: CategoryUpdate
+) -> Category:
+    """
+    Update a category, moving its subtree in the closure table when its
+    parent changes. Raises ``CategoryCycle`` if the new parent is in the
+    subtree.
+    """
+    moved = _new_parent(db_obj, obj_in)
+    if moved and obj_in.parent_id is not None:
+        cycle = _cycle_statement(db_obj.id, obj_in.parent_id)
+        if session.exec(cycle).first() is not None:
+            raise CategoryCycle("A category can't be moved under itself")
+    db_obj.sqlmodel_update(obj_in.model_dump(exclude_unset=True))
+    session.add(db_obj)
+    if moved:
+        session.exec(_detach_statement(db_obj.id))  # type: ignore
+        if db_obj.parent_id is not None:
+            session.exec(_attach_statement(db_obj.id, db_obj.parent_id))  # type: ignore
+    session.commit()
+    session.refresh(db_obj)
+    return db_obj
+
+
+async def update_category_async(
+    *, session: AsyncSession, db_obj: Category, obj_in: CategoryUpdate
+) -> Category:
+    moved = _new_parent(db_obj, obj_in)
+    if moved and obj_in.parent_id is not None:
+        cycle = _cycle_statement(db_obj.id, obj_in.parent_id)
+        if (await session.exec(cycle)).first() is not None:
+            raise CategoryCycle("A category can't be moved under itself")
+    db_obj.sqlmodel_update(obj_in.model_dump(exclude_unset=True))
+    session.add(db_obj)
+    if moved:
+        await session.exec(_detach_statement(db_obj.id))  # type: ignore
+        if db_obj.parent_id is not None:
+            await session.exec(_attach_statement(db_obj.id, db_obj.parent_id))  # type: ignore
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj
+
+
+def delete_category(*, session: Session, db_obj: Category) -> None:
+    """
+    Delete a category. Its subcategories become roots, so the paths from
+    its ancestors into its subtree are removed with it.
+    """
+    session.exec(_detach_statement(db_obj.id))  # type: ignore
+    session.delete(db_obj)
+    session.commit()
+
+
+async def delete_category_async(*, session: AsyncSession, db_obj: Category) -> None:
+    await session.exec(_detach_statement(db_obj.id))  # type: ignore
+    await session.delete(db_obj)
+    await session.commit()
+
+
+def _ancestors_statement(category_id: uuid.UUID) -> Any:
+    return (
+        select(Category)
+        .join(CategoryClosure, col(CategoryClosure.ancestor_id) == Category.id)
+        .where(col(CategoryClosure.descendant_id) == category_id)
+        .order_by(col(CategoryClosure.depth).desc())
+    )
+
+
+def get_category_ancestors(
+    *, session: Session, category_id: uuid.UUID
+) -> list[Category]:
+    """
+    The category and its ancestors, from the root down, for breadcrumbs.
+    Empty if the category doesn't exist.
+    """
+    return list(session.exec(_ancestors_statement(category_id)).all())
+
+
+async def get_category_ancestors_async(
+    *, session: AsyncSession, category_id: uuid.UUID
+) -> list[Category]:
+    return list((await session.exec(_ancestors_statement(category_id))).all())
+
+
+def _tree_statement() -> Select[Any]:
+    # Walks down from the roots, categories on a parent_id cycle are never
+    # reached. The path of names orders parents before their children and
+    # siblings by name
+    roots: Any = select(
+        col(Category.id),
+        col(Category.name),
+        col(Category.parent_id),
+        postgresql.array([col(Category.name)]).label("path"),  # type: ignore[no-untyped-call]
+    ).where(col(Category.parent_id).is_(None))
+    tree = roots.cte("tree", recursive=True)
+    child = aliased(Category)
+    tree = tree.union_all(
+        select(
+            child.id,
+            child.name,
+            child.parent_id,
+            func.array_append(tree.c.path, child.name),
+        ).join(tree, col(child.parent_id) == tree.c.id)
+    )
+    return select(tree.c.id, tree.c.name, tree.c.parent_id).order_by(tree.c.path)
+
+
+def _build_tree(rows: Any) -> list[CategoryTree]:
+    nodes: dict[uuid.UUID, CategoryTree] = {}
+    roots = []
+    for id, name, parent_id in rows:
+        node = CategoryTree(id=id, name=name, parent_id=parent_id)
+        nodes[id] = node
+        if parent_id is None:
+            roots.append(node)
+        else:
+            nodes[parent_id].subcategories.append(node)
+    return roots
+
+
+def get_category_tree(*, session: Session) -> list[CategoryTree]:
+    """
+    All the categories reachable from the root ones, nested, in one query.
+    """
+    return _build_tree(session.exec(_tree_statement()))  # type: ignore[call-overload]
+
+
+async def get_category_tree_async(*, session: AsyncSession) -> list[CategoryTree]:
+    return _build_tree(await session.exec(_tree_statement()))  # type: ignore[call-overload]
+
+
+def _subtree_products_statement(keyset: bool) -> Select[Any]:
+    # One index scan of at most a page per category of the subtree, in the
+    # order of the closure table's primary key, instead of a scan of the
+    # products of the whole subtree sorted by id
+    products = (
+        select(Product)
+        .where(col(Product.category_id) == CategoryClosure.descendant_id)
+        .order_by(col(Product.id))
+        .limit(bindparam("limit"))
+    )
+    subtree = col(CategoryClosure.ancestor_id) == bindparam("category_id")
+    if keyset:
+        after = tuple_(bindparam("after_category"), bindparam("after"))
+        products = products.where(
+            tuple_(col(Product.category_id), col(Product.id)) > after
+        )
+        subtree &= col(CategoryClosure.descendant_id) >= bindparam("after_category")
+    page = products.lateral()
+    product = aliased(Product, page)
+    statement: Any = (
+        select(product)
+        .select_from(CategoryClosure)
+        .join(page, true())
+        .where(subtree)
+        .order_by(col(CategoryClosure.descendant_id), page.c.id)
+        .limit(bindparam("limit"))
+    )
+    return statement  # type: ignore[no-any-return]
+
+
+_subtree_products_first_page = cached_statement(
+    _subtree_products_statement(keyset=False), category_id=uuid.UUID(int=0), limit=0
+)
+_subtree_products_next_page = cached_statement(
+    _subtree_products_statement(keyset=True),
+    category_id=uuid.UUID(int=0),
+    limit=0,
+    after_category=uuid.UUID(int=0),
+    after=uuid.UUID(int=0),
+)
+
+
+def _subtree_products_params(
+    category_id: uuid.UUID, limit: int, after: tuple[uuid.UUID, uuid.UUID] | None
+) -> tuple[Select[Any], dict[str, Any]]:
+    params: dict[str, Any] = {"category_id": category_id, "limit": limit}
+    if after is None:
+        return _subtree_products_first_page, params
+    params["after_category"], params["after"] = after
+    return _subtree_products_next_page, params
+
+
+def get_subtree_products(
+    *,
+    session: Session,
+    category_id: uuid.UUID,
+    limit: int,
+    after: tuple[uuid.UUID, uuid.UUID] | None = None,
+) -> list[Product]:
+    """
+    Products of the category and of its descendants, ordered by category
+    and id. ``after`` is the category and id of the last row of the
+    previous page.
+    """
+    statement, params = _subtree_products_params(category_id, limit, after)
+    return list(session.exec(statement, params=params).all())  # type: ignore[call-overload]
+
+
+async def get_subtree_products_async(
+    *,
+    session: AsyncSession,
+    category_id: uuid.UUID,
+    limit: int,
+    after: tuple[uuid.UUID, uuid.UUID] | None = None,
+) -> list[Product]:
+    statement, params = _subtree_products_params(category_id, limit, after)
+    result = await session.exec(statement, params=params)  # type: ignore[call-overload]
+    return list(result.all())
@@ -1,6 +1,12 @@
 import uuid
 from sqlmodel import Session
-from app.models import Item, ItemCreate
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.crud.base import CRUDBase, Filter
+from app.models import Item, ItemCreate, ItemUpdate
+
+item = CRUDBase[Item, ItemCreate, ItemUpdate](
+    Item, filters={"owner_id": Filter("owner_id")}
+)
 
 
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
@@ -9,3 +15,13 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+async def create_item_async(
+    *, session: AsyncSession, item_in: ItemCreate, owner_id: uuid.UUID
+) -> Item:
+    db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
+    session.add(db_item)
+    await session.commit()
+    await session.refresh(db_item)
+    return db_item
@@ -1,10 +1,236 @@
-from app.crud.base import CRUDBase
-from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate, ProductRead
+import html
+import uuid
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any, Literal
+
+from sqlalchemy import ColumnElement, Double, Select, bindparam, cast, func, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.statements import cached_statement
+from app.crud.base import CRUDBase, Filter, ListQuery
+from app.models.product import SEARCH_CONFIG, Product
+from app.schemas.product import (
+    CategoryCount,
+    PriceBucketCount,
+    ProductCreate,
+    ProductFacets,
+    ProductRead,
+    ProductUpdate,
+    StockCount,
+)
 
 
 class CRUDProduct(CRUDBase[ProductCreate, ProductUpdate, ProductRead]):
     pass
 
 
-product = CRUDProduct(Product)
+product = CRUDProduct(
+    Product,
+    filters={
+        "category_id": Filter("category_id"),
+        "price_min": Filter("price", "gte"),
+        "price_max": Filter("price", "lte"),
+        "in_stock": Filter("in_stock"),
+        "is_active": Filter("is_active"),
+    },
+    # Sorting on price needs a category_id filter, see the model's indexes
+    sorts=("price", "created_at", "name"),
+)
+
+# Wrap the matches in snippets, replaced by <mark> once the text is escaped
+_START, _STOP = "\x02", "\x03"
+
+
+def _search_statement(keyset: bool) -> Select[Any]:
+    search_vector = Product.__table__.c.search_vector  # type: ignore[attr-defined]
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, bindparam("q"))
+    # Ranking every match of a common word would take longer than the
+    # search itself, so only the most recently added matches are ranked. One
+    # more is read to tell whether the others were left out. Always taking
+    # the same ones keeps the (rank, id) pages consistent with each other
+    recency = (col(Product.created_at).desc(), col(Product.id).desc())
+    scanned = (
+        select(col(Product.id), col(Product.created_at), search_vector)
+        .where(search_vector.op("@@")(query))
+        .order_by(*recency)
+        .limit(bindparam("candidates") + 1)
+        .cte("scanned")
+    )
+    matches = (
+        select(scanned.c.id, scanned.c.search_vector)
+        .order_by(scanned.c.created_at.desc(), scanned.c.id.desc())
+        .limit(bindparam("candidates"))
+        .subquery()
+    )
+    capped = select(func.count()).select_from(scanned).scalar_subquery() > bindparam(
+        "candidates"
+    )
+    # ts_rank is a real, whose text form doesn't convert back exactly for
+    # the cursor comparison
+    rank = cast(func.ts_rank(matches.c.search_vector, query), Double)
+    page = (
+        select(matches.c.id, rank.label("rank"))
+        .order_by(rank.desc(), matches.c.id.desc())
+        .limit(bindparam("limit"))
+    )
+    if keyset:
+        after = tuple_(bindparam("after_rank", type_=Double), bindparam("after"))
+        page = page.where(tuple_(rank, matches.c.id) < after)
+    ranked = page.subquery()
+    # Only computed for the rows of the page, ts_headline parses the text again
+    snippet = func.ts_headline(
+        SEARCH_CONFIG,
+        func.coalesce(Product.description, Product.name),
+        query,
+        f"StartSel={_START}, StopSel={_STOP}, MaxWords=20, MinWords=5",
+    )
+    return (
+        select(Product, ranked.c.rank, snippet, capped)
+        .join(ranked, col(Product.id) == ranked.c.id)
+        .order_by(ranked.c.rank.desc(), col(Product.id).desc())
+    )
+
+
+_search_first_page = cached_statement(
+    _search_statement(keyset=False), q="warm", candidates=0, limit=0
+)
+_search_next_page = cached_statement(
+    _search_statement(keyset=True),
+    q="warm",
+    candidates=0,
+    limit=0,
+    after_rank=0.0,
+    after=uuid.UUID(int=0),
+)
+
+
+def highlight(snippet: str) -> str:
+    """
+    Escape a search snippet for HTML and wrap its matches in <mark>.
+    """
+    escaped = html.escape(snippet)
+    return escaped.replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def _search_params(
+    q: str, limit: int, after: tuple[float, uuid.UUID] | None
+) -> tuple[Select[Any], dict[str, Any]]:
+    params: dict[str, Any] = {
+        "q": q,
+        "limit": limit,
+        "candidates": settings.PRODUCT_SEARCH_MAX_CANDIDATES,
+    }
+    if after is None:
+        return _search_first_page, params
+    params["after_rank"], params["after"] = after
+    return _search_next_page, params
+
+
+def search_products(
+    *,
+    session: Session,
+    q: str,
+    limit: int,
+    after: tuple[float, uuid.UUID] | None = None,
+) -> list[tuple[Product, float, str, bool]]:
+    """
+    Products matching the web search syntax query ``q``, best ranked first,
+    with their rank, a snippet of the text around the matches and whether
+    more than ``PRODUCT_SEARCH_MAX_CANDIDATES`` products matched, in which
+    case only that many were ranked. ``after`` is the rank and id of the
+    last row of the previous page.
+    """
+    statement, params = _search_params(q, limit, after)
+    return list(session.exec(statement, params=params).all())  # type: ignore[call-overload]
+
+
+async def search_products_async(
+    *,
+    session: AsyncSession,
+    q: str,
+    limit: int,
+    after: tuple[float, uuid.UUID] | None = None,
+) -> list[tuple[Product, float, str, bool]]:
+    statement, params = _search_params(q, limit, after)
+    result = await session.exec(statement, params=params)  # type: ignore[call-overload]
+    return list(result.all())
+
+
+# Counts the product list can return next to a page, see ``product_facets``
+ProductFacet = Literal["category_id", "price", "in_stock"]
+
+
+def _price_bounds() -> list[Decimal]:
+    return [Decimal(bound) for bound in settings.PRODUCT_PRICE_FACET_BOUNDS]
+
+
+def _facets_statement(
+    where: list[ColumnElement[bool]], facets: Sequence[ProductFacet]
+) -> Select[Any]:
+    bounds: Any = postgresql.array(_price_bounds())  # type: ignore[no-untyped-call]
+    # 0 below the first bound, i from bounds[i - 1] up to bounds[i]
+    bucket = func.width_bucket(col(Product.price), bounds)
+    columns = {
+        "category_id": col(Product.category_id),
+        "price": bucket,
+        "in_stock": col(Product.in_stock),
+    }
+    # One grouping set per facet, all counted in a single scan of the rows.
+    # grouping() is 0 for the columns the set of a result row groups by
+    grouped = [columns[facet] for facet in facets]
+    statement: Select[Any] = select(  # type: ignore[call-overload]
+        *grouped, *(func.grouping(column) for column in grouped), func.count()
+    )
+    return statement.where(*where).group_by(
+        func.grouping_sets(*(tuple_(column) for column in grouped))
+    )
+
+
+def _facets_from_rows(
+    rows: Sequence[Any], facets: Sequence[ProductFacet]
+) -> ProductFacets:
+    counts: dict[str, list[tuple[Any, int]]] = {facet: [] for facet in facets}
+    for row in rows:
+        values, grouping, count = row[: len(facets)], row[len(facets) : -1], row[-1]
+        facet_index = grouping.index(0)
+        counts[facets[facet_index]].append((values[facet_index], count))
+    result = ProductFacets()
+    if "category_id" in counts:
+        result.category_id = [
+            CategoryCount(category_id=value, count=count)
+            for value, count in sorted(counts["category_id"], key=lambda c: -c[1])
+        ]
+    if "price" in counts:
+        bounds: list[Decimal | None] = [None, *_price_bounds(), None]
+        result.price = [
+            PriceBucketCount(min=bounds[value], max=bounds[value + 1], count=count)
+            for value, count in sorted(counts["price"])
+        ]
+    if "in_stock" in counts:
+        result.in_stock = [
+            StockCount(in_stock=value, count=count)
+            for value, count in sorted(counts["in_stock"], reverse=True)
+        ]
+    return result
+
+
+def product_facets(
+    *, session: Session, query: ListQuery, facets: Sequence[ProductFacet]
+) -> ProductFacets:
+    """
+    Counts of the products matching ``query`` per value of each of the
+    ``facets``, or per price bucket for ``price``.
+    """
+    rows = session.exec(_facets_statement(query.where, facets)).all()  # type: ignore[call-overload]
+    return _facets_from_rows(rows, facets)
+
+
+async def product_facets_async(
+    *, session: AsyncSession, query: ListQuery, facets: Sequence[ProductFacet]
+) -> ProductFacets:
+    result = await session.exec(_facets_statement(query.where, facets))  # type: ignore[call-overload]
+    return _facets_from_rows(result.all(), facets)
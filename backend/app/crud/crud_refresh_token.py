@@ -0,0 +1,123 @@
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import ColumnElement, Update
+from sqlmodel import Session, col, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.config import settings
+from app.core.security import hash_token
+from app.models import RefreshToken
+
+
+def _new_refresh_token(
+    user_id: uuid.UUID, family_id: uuid.UUID | None
+) -> tuple[RefreshToken, str]:
+    token = secrets.token_urlsafe(32)
+    db_obj = RefreshToken(
+        token_hash=hash_token(token),
+        user_id=user_id,
+        family_id=family_id or uuid.uuid4(),
+        expires_at=datetime.utcnow()
+        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return db_obj, token
+
+
+def create_refresh_token(
+    *, session: Session, user_id: uuid.UUID, family_id: uuid.UUID | None = None
+) -> str:
+    """
+    Store a new refresh token and return it; only its digest is persisted.
+    """
+    db_obj, token = _new_refresh_token(user_id, family_id)
+    session.add(db_obj)
+    session.commit()
+    return token
+
+
+async def create_refresh_token_async(
+    *, session: AsyncSession, user_id: uuid.UUID, family_id: uuid.UUID | None = None
+) -> str:
+    db_obj, token = _new_refresh_token(user_id, family_id)
+    session.add(db_obj)
+    await session.commit()
+    return token
+
+
+def _refresh_token_statement(token: str) -> SelectOfScalar[RefreshToken]:
+    return select(RefreshToken).where(RefreshToken.token_hash == hash_token(token))
+
+
+def get_refresh_token(*, session: Session, token: str) -> RefreshToken | None:
+    return session.exec(_refresh_token_statement(token)).first()
+
+
+async def get_refresh_token_async(
+    *, session: AsyncSession, token: str
+) -> RefreshToken | None:
+    return (await session.exec(_refresh_token_statement(token))).first()
+
+
+def _mark_used_statement(db_token: RefreshToken) -> Update:
+    return (
+        update(RefreshToken)
+        .where(col(RefreshToken.id) == db_token.id)
+        .where(col(RefreshToken.used_at).is_(None))
+        .values(used_at=datetime.utcnow())
+    )
+
+
+def mark_refresh_token_used(*, session: Session, db_token: RefreshToken) -> bool:
+    """
+    Flag the token as rotated. Returns False if it had already been used,
+    including by a concurrent request.
+    """
+    result = session.exec(_mark_used_statement(db_token))  # type: ignore
+    return bool(result.rowcount == 1)
+
+
+async def mark_refresh_token_used_async(
+    *, session: AsyncSession, db_token: RefreshToken
+) -> bool:
+    result = await session.exec(_mark_used_statement(db_token))  # type: ignore
+    return bool(result.rowcount == 1)
+
+
+def _revoke_statement(condition: ColumnElement[bool]) -> Update:
+    return (
+        update(RefreshToken)
+        .where(condition)
+        .where(col(RefreshToken.revoked_at).is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def revoke_refresh_token_family(*, session: Session, family_id: uuid.UUID) -> None:
+    statement = _revoke_statement(col(RefreshToken.family_id) == family_id)
+    session.exec(statement)  # type: ignore
+    session.commit()
+
+
+async def revoke_refresh_token_family_async(
+    *, session: AsyncSession, family_id: uuid.UUID
+) -> None:
+    statement = _revoke_statement(col(RefreshToken.family_id) == family_id)
+    await session.exec(statement)  # type: ignore
+    await session.commit()
+
+
+def revoke_user_refresh_tokens(*, session: Session, user_id: uuid.UUID) -> None:
+    statement = _revoke_statement(col(RefreshToken.user_id) == user_id)
+    session.exec(statement)  # type: ignore
+    session.commit()
+
+
+async def revoke_user_refresh_tokens_async(
+    *, session: AsyncSession, user_id: uuid.UUID
+) -> None:
+    statement = _revoke_statement(col(RefreshToken.user_id) == user_id)
+    await session.exec(statement)  # type: ignore
+    await session.commit()
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import Delete
+from sqlmodel import Session, col, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.revocation import revocation_list
+from app.models import RevokedToken
+
+
+def _delete_expired_statement() -> Delete:
+    # Expired tokens are rejected anyway, their rows are no longer needed
+    return delete(RevokedToken).where(col(RevokedToken.expires_at) <= datetime.utcnow())
+
+
+def revoke_access_token(*, session: Session, jti: str, expires_at: datetime) -> None:
+    if session.get(RevokedToken, jti) is None:
+        session.add(RevokedToken(jti=jti, expires_at=expires_at))
+    session.exec(_delete_expired_statement())  # type: ignore
+    session.commit()
+    revocation_list.add(jti)
+
+
+async def revoke_access_token_async(
+    *, session: AsyncSession, jti: str, expires_at: datetime
+) -> None:
+    if await session.get(RevokedToken, jti) is None:
+        session.add(RevokedToken(jti=jti, expires_at=expires_at))
+    await session.exec(_delete_expired_statement())  # type: ignore
+    await session.commit()
+    revocation_list.add(jti)
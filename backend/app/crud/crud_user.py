@@ -1,14 +1,31 @@
 import uuid
 from typing import Any
 from sqlmodel import Session, select
-from app.core.security import get_password_hash, verify_password
-from app.models import User, UserCreate, UserUpdate
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    verify_and_update_password,
+    verify_and_update_password_async,
+)
+from app.crud.base import CRUDBase, Filter
+from app.models import User, UserCreate, UserUpdate, UserUpdateMe
 
+user = CRUDBase[User, UserCreate, UserUpdate](
+    User,
+    filters={"is_active": Filter("is_active"), "is_superuser": Filter("is_superuser")},
+    sorts=("email",),
+)
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+
+def create_user(
+    *, session: Session, user_create: UserCreate, hashed_password: str | None = None
+) -> User:
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_create.password)
     db_obj = User.model_validate(
         user_create,
-        update={"hashed_password": get_password_hash(user_create.password)},
+        update={"hashed_password": hashed_password},
     )
     session.add(db_obj)
     session.commit()
@@ -16,12 +33,38 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     return db_obj
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+async def create_user_async(*, session: AsyncSession, user_create: UserCreate) -> User:
+    hashed_password = await get_password_hash_async(user_create.password)
+    db_obj = User.model_validate(
+        user_create,
+        update={"hashed_password": hashed_password},
+    )
+    session.add(db_obj)
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj
+
+
+def _get_update_data(
+    db_user: User, user_in: UserUpdate | UserUpdateMe
+) -> tuple[dict[str, Any], dict[str, Any], str | None]:
+    """
+    Fields to set on the user, extra column values and the new password.
+    """
     user_data = user_in.model_dump(exclude_unset=True)
-    extra_data = {}
-    if "password" in user_data:
-        hashed_password = get_password_hash(user_data.pop("password"))
-        extra_data["hashed_password"] = hashed_password
+    extra_data: dict[str, Any] = {}
+    if user_data.keys() & {"password", "is_active", "is_superuser"}:
+        # Revoke self-contained access tokens carrying the old status
+        extra_data["token_version"] = db_user.token_version + 1
+    return user_data, extra_data, user_data.pop("password", None)
+
+
+def update_user(
+    *, session: Session, db_user: User, user_in: UserUpdate | UserUpdateMe
+) -> Any:
+    user_data, extra_data, password = _get_update_data(db_user, user_in)
+    if password is not None:
+        extra_data["hashed_password"] = get_password_hash(password)
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
@@ -29,15 +72,66 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     return db_user
 
 
+async def update_user_async(
+    *, session: AsyncSession, db_user: User, user_in: UserUpdate | UserUpdateMe
+) -> Any:
+    user_data, extra_data, password = _get_update_data(db_user, user_in)
+    if password is not None:
+        extra_data["hashed_password"] = await get_password_hash_async(password)
+    db_user.sqlmodel_update(user_data, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    return db_user
+
+
 def get_user_by_email(*, session: Session, email: str) -> User | None:
     statement = select(User).where(User.email == email)
     return session.exec(statement).first()
 
 
+async def get_user_by_email_async(*, session: AsyncSession, email: str) -> User | None:
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
+
+def _update_password_hash(
+    *, session: Session, db_user: User, hashed_password: str
+) -> None:
+    db_user.hashed_password = hashed_password
+    session.add(db_user)
+    session.commit()
+    session.refresh(db_user)
+
+
 def authenticate(*, session: Session, email: str, password: str) -> User | None:
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, db_user.hashed_password)
+    if not verified:
+        return None
+    if new_hash:
+        _update_password_hash(
+            session=session, db_user=db_user, hashed_password=new_hash
+        )
+    return db_user
+
+
+async def authenticate_async(
+    *, session: AsyncSession, email: str, password: str
+) -> User | None:
+    db_user = await get_user_by_email_async(session=session, email=email)
+    if not db_user:
+        return None
+    verified, new_hash = await verify_and_update_password_async(
+        password, db_user.hashed_password
+    )
+    if not verified:
         return None
+    if new_hash:
+        db_user.hashed_password = new_hash
+        session.add(db_user)
+        await session.commit()
+        await session.refresh(db_user)
     return db_user
@@ -1,10 +1,26 @@
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.api_keys import flush_api_key_usage
+from app.core.autocomplete import refresh_product_suggestions
+from app.core.budgets import DBTimeBudgetExceeded, count_budget_exceeded
 from app.core.config import settings
+from app.core.db import async_engine, engine, replica_async_engines, replica_engines
+from app.core.hashing import HashingQueueFull, password_hasher
+from app.core.query_stats import check_query_budget, route_name, track_queries
+from app.core.revocation import refresh_revocation_list
+from app.core.slow_queries import slow_query_log
+from app.core.statements import warm_compiled_cache, warm_compiled_cache_async
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,12 +30,95 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+async def flush_api_key_usage_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.API_KEY_USAGE_FLUSH_SECONDS)
+        await run_in_threadpool(flush_api_key_usage)
+
+
+async def refresh_product_suggestions_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.PRODUCT_SUGGEST_REFRESH_SECONDS)
+        await run_in_threadpool(refresh_product_suggestions)
+
+
+async def refresh_revocation_list_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.TOKEN_REVOCATION_REFRESH_SECONDS)
+        await run_in_threadpool(refresh_revocation_list, engine)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Compile the hot queries for the engines that serve requests
+    if settings.POSTGRES_ASYNC_DRIVER:
+        for db_engine in [async_engine, *replica_async_engines]:
+            await warm_compiled_cache_async(db_engine)
+    else:
+        for sync_db_engine in [engine, *replica_engines]:
+            await run_in_threadpool(warm_compiled_cache, sync_db_engine)
+    await run_in_threadpool(refresh_product_suggestions)
+    await run_in_threadpool(refresh_revocation_list, engine)
+    usage_flusher = asyncio.create_task(flush_api_key_usage_periodically())
+    suggestions_refresher = asyncio.create_task(
+        refresh_product_suggestions_periodically()
+    )
+    revocations_refresher = asyncio.create_task(refresh_revocation_list_periodically())
+    yield
+    for task in (usage_flusher, suggestions_refresher, revocations_refresher):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await run_in_threadpool(flush_api_key_usage)
+    await async_engine.dispose()
+    password_hasher.shutdown()
+    slow_query_log.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
+
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full_handler(
+    _request: Request, _exc: HashingQueueFull
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many concurrent logins, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(DBTimeBudgetExceeded)
+async def db_time_budget_exceeded_handler(
+    request: Request, _exc: DBTimeBudgetExceeded
+) -> JSONResponse:
+    count_budget_exceeded(route_name(request.scope))
+    return JSONResponse(
+        status_code=504, content={"detail": "Database time budget exceeded"}
+    )
+
+
+@app.middleware("http")
+async def count_queries(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    with track_queries(request.scope) as stats:
+        response = await call_next(request)
+    if settings.ENVIRONMENT != "production":
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.duration * 1000:.2f}"
+        response.headers["X-DB-Duplicate-Queries"] = str(stats.duplicates)
+    check_query_budget(stats, route_name(request.scope))
+    return response
+
+
 origins = [
     "http://localhost",
     "http://localhost:5173",
@@ -1,16 +1,25 @@
 from .user import (
-    User,
-    UserBase,
-    UserCreate,
-    UserUpdate,
-    UserUpdateMe,
-    UserPublic,
-    UsersPublic,
-    UpdatePassword,
-    UserRegister,
+    UpdatePassword as UpdatePassword,
+    User as User,
+    UserBase as UserBase,
+    UserCreate as UserCreate,
+    UserPublic as UserPublic,
+    UserRegister as UserRegister,
+    UsersPublic as UsersPublic,
+    UserUpdate as UserUpdate,
+    UserUpdateMe as UserUpdateMe,
 )
 from .category import *
 from .item import *
 from .auth import *
+from .api_key import (
+    ApiKey as ApiKey,
+    ApiKeyBase as ApiKeyBase,
+    ApiKeyCreate as ApiKeyCreate,
+    ApiKeyCreated as ApiKeyCreated,
+    ApiKeyPublic as ApiKeyPublic,
+    ApiKeyScope as ApiKeyScope,
+    ApiKeysPublic as ApiKeysPublic,
+)
 from .message import *
 from .product import *
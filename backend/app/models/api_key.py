@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import Column, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Field, SQLModel
+
+# Read-only access to the catalogue for service integrations
+ApiKeyScope = Literal["items:read", "products:read"]
+
+
+class ApiKeyBase(SQLModel):
+    name: str = Field(min_length=1, max_length=255)
+
+
+class ApiKeyCreate(ApiKeyBase):
+    scopes: list[ApiKeyScope] = Field(min_length=1)
+    expires_at: datetime | None = None
+
+
+class ApiKey(ApiKeyBase, table=True):
+    __tablename__ = "api_key"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Public part of the key, used to look it up
+    prefix: str = Field(max_length=16, unique=True, index=True)
+    # SHA-256 of the secret part, the secret itself is never stored
+    secret_hash: str = Field(max_length=64)
+    scopes: list[str] = Field(sa_column=Column(ARRAY(String), nullable=False))
+    owner_id: uuid.UUID = Field(
+        foreign_key="users.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime | None = None
+    revoked_at: datetime | None = None
+    # Updated in batches, so slightly behind the actual usage
+    last_used_at: datetime | None = None
+    usage_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class ApiKeyPublic(ApiKeyBase):
+    id: uuid.UUID
+    prefix: str
+    scopes: list[str]
+    created_at: datetime
+    expires_at: datetime | None
+    last_used_at: datetime | None
+    usage_count: int
+
+
+class ApiKeyCreated(ApiKeyPublic):
+    # Only returned once, when the key is created
+    key: str
+
+
+class ApiKeysPublic(SQLModel):
+    data: list[ApiKeyPublic]
+    count: int
@@ -1,13 +1,54 @@
+import uuid
+from datetime import datetime
+
 from sqlmodel import SQLModel, Field
 
 
 class Token(SQLModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+
+class RefreshTokenRequest(SQLModel):
+    refresh_token: str
+
+
+class RefreshToken(SQLModel, table=True):
+    __tablename__ = "refresh_token"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # HMAC-SHA256 of the token, the token itself is never stored
+    token_hash: str = Field(max_length=64, unique=True, index=True)
+    user_id: uuid.UUID = Field(
+        foreign_key="users.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    # Every token obtained by rotating the same login shares its family
+    family_id: uuid.UUID = Field(index=True)
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    used_at: datetime | None = None
+    revoked_at: datetime | None = None
 
 
 class TokenPayload(SQLModel):
     sub: str | None = None
+    exp: int | None = None
+    jti: str | None = None
+    # Only present in self-contained tokens (ACCESS_TOKEN_EMBED_CLAIMS)
+    act: bool | None = None
+    su: bool | None = None
+    ver: int | None = None
+
+
+class RevokedToken(SQLModel, table=True):
+    __tablename__ = "revoked_token"
+
+    # "jti" claim of the revoked access token
+    jti: str = Field(primary_key=True, max_length=32)
+    # Rows can be deleted once the token would have expired anyway
+    expires_at: datetime = Field(index=True)
+    revoked_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
 class NewPassword(SQLModel):
@@ -1,6 +1,7 @@
 import uuid
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 from app.models.product import Product
@@ -30,6 +31,28 @@ class Category(CategoryBase, table=True):
     products: list["Product"] = Relationship(back_populates="category")
 
 
+class CategoryClosure(SQLModel, table=True):
+    """
+    One row per category and each of its ancestors, itself included at depth
+    0, so subtrees and ancestors are read with an index instead of walking
+    parent_id. Kept up to date by ``crud_category``.
+    """
+
+    __tablename__ = "category_closure"
+    # Ancestors of a category, the primary key serves its descendants
+    __table_args__ = (
+        Index("ix_category_closure_descendant_id", "descendant_id", "depth"),
+    )
+
+    ancestor_id: uuid.UUID = Field(
+        foreign_key="category.id", primary_key=True, ondelete="CASCADE"
+    )
+    descendant_id: uuid.UUID = Field(
+        foreign_key="category.id", primary_key=True, ondelete="CASCADE"
+    )
+    depth: int
+
+
 class CategoryCreate(CategoryBase):
     pass
 
@@ -43,6 +66,11 @@ class CategoryPublic(CategoryBase):
     id: uuid.UUID
 
 
+class CategoryTree(CategoryPublic):
+    subcategories: list["CategoryTree"] = []
+
+
 class CategoriesPublic(SQLModel):
     data: list[CategoryPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
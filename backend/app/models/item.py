@@ -1,4 +1,5 @@
 import uuid
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -17,6 +18,8 @@ class ItemUpdate(ItemBase):
 
 class Item(ItemBase, table=True):
     __tablename__ = "items"
+    # Pages of a user's items, ordered by id
+    __table_args__ = (Index("ix_items_owner_id_id", "owner_id", "id"),)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     owner_id: uuid.UUID = Field(
         foreign_key="users.id", nullable=False, ondelete="CASCADE"
@@ -31,4 +34,5 @@ class ItemPublic(ItemBase):
 
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
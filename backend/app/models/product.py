@@ -3,11 +3,45 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
+# Text search configuration of the search vector and of search queries
+SEARCH_CONFIG = "english"
+
 
 class Product(SQLModel, table=True):
     __tablename__ = "product"
+    # Sort orders of the product list, see crud_product
+    __table_args__ = (
+        Index("ix_product_category_id_price", "category_id", "price", "id"),
+        Index("ix_product_category_id_created_at", "category_id", "created_at", "id"),
+        # Also the candidates of a search for a common word, newest first, see
+        # crud_product
+        Index("ix_product_created_at", "created_at", "id"),
+        # Also pages through the products of a category subtree, see
+        # crud_category
+        Index("ix_product_category_id_id", "category_id", "id"),
+        # Products changed since the last suggestions refresh, see
+        # app.core.autocomplete
+        Index("ix_product_updated_at", "updated_at"),
+        # Maintained by Postgres, read through Product.__table__ by the search
+        Column(
+            "search_vector",
+            TSVECTOR,
+            Computed(
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', name), 'A') || "
+                "setweight(to_tsvector('simple', sku), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+                "coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+        Index("ix_product_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    # Not loaded with the product
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     name: str = Field(max_length=150, index=True)
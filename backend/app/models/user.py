@@ -23,6 +23,8 @@ class User(UserBase, table=True):
     __tablename__ = "users"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
+    # Bumped to revoke every access token issued with an older version
+    token_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
 
 
@@ -49,4 +51,5 @@ class UpdatePassword(SQLModel):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
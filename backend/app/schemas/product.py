@@ -1,22 +1,21 @@
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # Shared fields between all schemas
 class ProductBase(BaseModel):
     name: str
-    description: Optional[str] = None
-    sku: Optional[str] = None
+    description: str | None = None
+    sku: str | None = None
     price: Decimal
     quantity: int
     in_stock: bool = True
-    image_url: Optional[str] = None
+    image_url: str | None = None
     is_active: bool = True
-    category_id: Optional[uuid.UUID] = None
+    category_id: uuid.UUID | None = None
 
 
 # Schema for creating a product
@@ -29,14 +28,14 @@ class ProductCreate(ProductBase):
 
 # Schema for updating a product
 class ProductUpdate(BaseModel):
-    name: Optional[str] = None
-    description: Optional[str] = None
-    price: Optional[Decimal] = None
-    quantity: Optional[int] = None
-    in_stock: Optional[bool] = None
-    image_url: Optional[str] = None
-    is_active: Optional[bool] = None
-    category_id: Optional[uuid.UUID] = None
+    name: str | None = None
+    description: str | None = None
+    price: Decimal | None = None
+    quantity: int | None = None
+    in_stock: bool | None = None
+    image_url: str | None = None
+    is_active: bool | None = None
+    category_id: uuid.UUID | None = None
 
 
 # Schema for reading data (response)
@@ -47,3 +46,56 @@ class ProductRead(ProductBase):
 
     class Config:
         from_attributes = True
+
+
+class ProductSearchHit(ProductRead):
+    rank: float
+    # Description, or name, around the matches, which are wrapped in <mark>
+    snippet: str
+
+
+class ProductSuggestion(BaseModel):
+    id: uuid.UUID
+    name: str
+    sku: str
+
+
+class CategoryCount(BaseModel):
+    category_id: uuid.UUID
+    count: int
+
+
+class PriceBucketCount(BaseModel):
+    # None for the first and last buckets, which are open ended
+    min: Decimal | None = None
+    max: Decimal | None = None
+    count: int
+
+
+class StockCount(BaseModel):
+    in_stock: bool
+    count: int
+
+
+# Counts of the products matching a list's filters, for the facets requested
+class ProductFacets(BaseModel):
+    category_id: list[CategoryCount] | None = None
+    price: list[PriceBucketCount] | None = None
+    in_stock: list[StockCount] | None = None
+
+
+class ProductSearchResults(BaseModel):
+    data: list[ProductSearchHit]
+    next_cursor: str | None = None
+    capped: bool = Field(
+        default=False,
+        description="More products matched than PRODUCT_SEARCH_MAX_CANDIDATES. "
+        "Only the most recently added ones were ranked, so better matches among "
+        "the older products may be missing",
+    )
+
+
+# Products of a category subtree, ordered by category then id
+class CategoryProducts(BaseModel):
+    data: list[ProductRead]
+    next_cursor: str | None = None
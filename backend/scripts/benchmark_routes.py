@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = [
+    f"{settings.API_V1_STR}/products/",
+    f"{settings.API_V1_STR}/categories/",
+    f"{settings.API_V1_STR}/items/",
+]
+
+
+@dataclass
+class LoadResult:
+    concurrency: int
+    requests: int
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p99_ms: float
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+async def run_load(
+    client: httpx.AsyncClient, path: str, concurrency: int, duration: float
+) -> LoadResult:
+    """
+    Send GET requests to ``path`` from ``concurrency`` concurrent clients for
+    ``duration`` seconds.
+    """
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(deadline: float) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return LoadResult(
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        requests_per_second=len(latencies) / elapsed,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+    )
+
+
+def best_within_target(
+    results: list[LoadResult], p99_target_ms: float
+) -> LoadResult | None:
+    """
+    Highest throughput among the error-free runs that met the p99 target.
+    """
+    within_target = [
+        result
+        for result in results
+        if result.p99_ms <= p99_target_ms and result.errors == 0
+    ]
+    return max(within_target, key=lambda r: r.requests_per_second, default=None)
+
+
+async def benchmark(args: argparse.Namespace) -> None:
+    headers = {}
+    if args.api_key:
+        headers["X-API-Key"] = args.api_key
+    if args.token:
+        headers["Authorization"] = f"Bearer {args.token}"
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(
+        base_url=args.base_url, headers=headers, limits=limits, timeout=30
+    ) as client:
+        for path in args.paths:
+            results = []
+            for concurrency in args.concurrency:
+                result = await run_load(client, path, concurrency, args.duration)
+                logger.info(
+                    f"GET {path} concurrency={concurrency}: "
+                    f"{result.requests_per_second:.0f} req/s, "
+                    f"p50 {result.p50_ms:.1f} ms, p99 {result.p99_ms:.1f} ms, "
+                    f"{result.errors} errors"
+                )
+                results.append(result)
+            best = best_within_target(results, args.p99_target_ms)
+            if best is None:
+                logger.info(f"GET {path}: no run met the p99 target")
+            else:
+                logger.info(
+                    f"GET {path}: {best.requests_per_second:.0f} req/s within "
+                    f"the p99 target, at concurrency={best.concurrency}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load test read endpoints of a running server, run it once with "
+            "POSTGRES_ASYNC_DRIVER on and once off to compare both"
+        )
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--path",
+        dest="paths",
+        action="append",
+        help="Endpoint to load, can be repeated. Defaults to the catalogue reads",
+    )
+    parser.add_argument("--token", help="Access token sent as a bearer token")
+    parser.add_argument("--api-key", help="API key sent in X-API-Key")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[8, 16, 32, 64, 128],
+        help="Concurrent clients, one run per value",
+    )
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per run")
+    parser.add_argument(
+        "--p99-target-ms",
+        type=float,
+        default=100,
+        help="Latency target the reported throughput has to meet",
+    )
+    args = parser.parse_args()
+    args.paths = args.paths or DEFAULT_PATHS
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
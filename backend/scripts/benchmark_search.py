@@ -0,0 +1,150 @@
+import argparse
+import logging
+import math
+import time
+import uuid
+
+from sqlalchemy import create_engine, text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud.crud_product import search_products
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words of the generated product names, each in about 5% of the products
+WORDS = (
+    "acoustic adapter aluminium backpack bamboo battery blender bluetooth "
+    "bottle bracelet brush cable camera candle canvas carbon ceramic chair "
+    "charger classic compact cordless cotton crystal cushion denim desk "
+    "digital drone earbuds electric ergonomic espresso fabric folding gaming "
+    "glass gloves grinder hammock headphones heater helmet hoodie jacket "
+    "kettle keyboard lamp lantern laptop leather lens linen magnetic marble "
+    "mattress microphone mirror monitor mouse mug notebook organic outdoor "
+    "pillow planter portable premium printer projector purifier rechargeable "
+    "router rug sandals scarf scooter sensor shelf silicone skillet sneakers "
+    "speaker stainless steel stool sunglasses tablet tent thermal tripod "
+    "umbrella vacuum velvet wallet watch waterproof wireless wooden"
+).split()
+# Made up words filling the descriptions, each in about 2% of the products
+SYLLABLES = "ba ce di fo gu ka le mi no pu ra se ti vo zu bel dor fin gan lor mar nes tor vin".split()
+
+QUERIES = [
+    # A common word, more matches than are ranked
+    "wireless",
+    # Two common words, all of them must match
+    "wireless headphones",
+    '"stainless steel"',
+    "leather -wallet",
+    "no such product",
+]
+
+
+def seed_catalogue(session: Session, products: int) -> uuid.UUID:
+    """
+    Insert ``products`` generated products in a new category, and return
+    the category's id.
+    """
+    category_id = uuid.uuid4()
+    session.execute(
+        text("INSERT INTO category (id, name) VALUES (:id, 'Search benchmark')"),
+        {"id": category_id},
+    )
+    # The words depend on i, so that they are drawn again for each row
+    session.execute(
+        text(
+            "INSERT INTO product (id, name, description, sku, price, quantity, "
+            "in_stock, is_active, category_id, created_at, updated_at) "
+            "SELECT gen_random_uuid(), "
+            "initcap(array_to_string(ARRAY(SELECT v.w[1 + floor(random() * "
+            "cardinality(v.w))::int] FROM generate_series(1, 3 + 0 * i)), ' ')), "
+            "array_to_string(ARRAY(SELECT v.w[1 + floor(random() * "
+            "cardinality(v.w))::int] FROM generate_series(1, 2 + 0 * i)) || "
+            "ARRAY(SELECT v.s[1 + floor(random() * cardinality(v.s))::int] || "
+            "v.s[1 + floor(random() * cardinality(v.s))::int] "
+            "FROM generate_series(1, 10 + 0 * i)), ' '), "
+            ":sku_prefix || i, round((random() * 500)::numeric, 2), i % 100, "
+            "i % 10 > 0, true, :category_id, "
+            "now() - i * interval '1 minute', now() - i * interval '1 minute' "
+            "FROM generate_series(1, :products) AS i, "
+            "(SELECT CAST(:words AS text[]) AS w, CAST(:syllables AS text[]) AS s) "
+            "AS v"
+        ),
+        {
+            "words": list(WORDS),
+            "syllables": SYLLABLES,
+            "sku_prefix": f"BENCH-{category_id.hex[:8]}-",
+            "category_id": category_id,
+            "products": products,
+        },
+    )
+    session.commit()
+    session.execute(text("ANALYZE product"))
+    # Or the statistics are rolled back with the searches' transactions
+    session.commit()
+    return category_id
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def time_search(
+    session: Session, q: str, limit: int, iterations: int
+) -> tuple[float, float]:
+    """
+    Median and p99 milliseconds of a search for ``q`` and of the next page.
+    """
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows = search_products(session=session, q=q, limit=limit + 1)
+        if len(rows) > limit:
+            product, rank, *_ = rows[limit - 1]
+            search_products(
+                session=session, q=q, limit=limit + 1, after=(rank, product.id)
+            )
+        timings.append((time.perf_counter() - start) * 1000)
+        session.rollback()
+    return percentile(timings, 50), percentile(timings, 99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time product searches, after optionally seeding a generated "
+            "catalogue. Each timing covers a first and a second page"
+        )
+    )
+    parser.add_argument(
+        "--database-url", help="Database to run against, defaults to the configured one"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Products to generate first"
+    )
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument(
+        "--iterations", type=int, default=50, help="Searches timed per query"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url or str(settings.SQLALCHEMY_DATABASE_URI))
+    try:
+        with Session(engine) as session:
+            if args.seed:
+                logger.info(f"Generating {args.seed} products")
+                seed_catalogue(session, args.seed)
+            for q in QUERIES:
+                # Let the caches fill before timing
+                time_search(session, q, args.limit, iterations=3)
+                p50_ms, p99_ms = time_search(session, q, args.limit, args.iterations)
+                logger.info(f"{q}: p50 {p50_ms:.1f} ms, p99 {p99_ms:.1f} ms")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
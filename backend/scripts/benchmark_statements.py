@@ -0,0 +1,172 @@
+import argparse
+import logging
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Connection, Executable, create_engine
+from sqlmodel import col, func, select
+
+from app.api.routes.items import list_items
+from app.api.routes.product import list_products
+from app.core.config import settings
+from app.core.pipeline import run_pipeline, to_driver
+from app.models import Item, Product
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A query as built by a request: the statement and its parameters
+QueryBuilder = Callable[[int], tuple[Executable, dict[str, Any]]]
+
+
+@dataclass
+class Mode:
+    name: str
+    # Reuse the module-level statements instead of building them per query
+    cached_statements: bool
+    compiled_cache_size: int
+    prepare_threshold: int | None
+    # Send the queries of a listing in one round trip
+    pipelined: bool = False
+
+
+MODES = [
+    Mode("inline select, no caching", False, 0, None),
+    Mode("cached statements", True, settings.SQLALCHEMY_COMPILED_CACHE_SIZE, None),
+    Mode(
+        "cached statements, prepared",
+        True,
+        settings.SQLALCHEMY_COMPILED_CACHE_SIZE,
+        0,
+    ),
+    Mode(
+        "cached statements, pipelined",
+        True,
+        settings.SQLALCHEMY_COMPILED_CACHE_SIZE,
+        None,
+        pipelined=True,
+    ),
+]
+
+# Each listing runs a count and a page query, like its route
+QUERIES: dict[str, tuple[list[QueryBuilder], list[QueryBuilder]]] = {
+    "product listing": (
+        [
+            lambda _: (select(func.count()).select_from(Product), {}),
+            lambda limit: (
+                select(Product).order_by(col(Product.id)).offset(0).limit(limit),
+                {},
+            ),
+        ],
+        [
+            lambda _: (list_products.count, {}),
+            lambda limit: (list_products.offset, {"skip": 0, "limit": limit}),
+        ],
+    ),
+    "item listing": (
+        [
+            lambda _: (select(func.count()).select_from(Item), {}),
+            lambda limit: (
+                select(Item).order_by(col(Item.id)).offset(0).limit(limit),
+                {},
+            ),
+        ],
+        [
+            lambda _: (list_items.count, {}),
+            lambda limit: (list_items.offset, {"skip": 0, "limit": limit}),
+        ],
+    ),
+}
+
+
+def time_listing(
+    connection: Connection,
+    builders: list[QueryBuilder],
+    limit: int,
+    iterations: int,
+    pipelined: bool = False,
+) -> float:
+    """
+    Median seconds to build and run the queries of one listing.
+    """
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        queries = [build(limit) for build in builders]
+        if pipelined:
+            run_pipeline(
+                connection.connection.driver_connection,  # type: ignore[arg-type]
+                to_driver(queries, connection.dialect),  # type: ignore[arg-type]
+            )
+        else:
+            for statement, params in queries:
+                connection.execute(statement, params).all()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_mode(
+    mode: Mode, limit: int, iterations: int, database_url: str | None = None
+) -> dict[str, float]:
+    """
+    Median milliseconds per listing in ``mode``, by listing.
+    """
+    engine = create_engine(
+        database_url or str(settings.SQLALCHEMY_DATABASE_URI),
+        query_cache_size=mode.compiled_cache_size,
+        connect_args={"prepare_threshold": mode.prepare_threshold},
+    )
+    results = {}
+    try:
+        with engine.connect() as connection:
+            for name, (inline, cached) in QUERIES.items():
+                builders = cached if mode.cached_statements else inline
+                # Let the caches fill before timing
+                time_listing(connection, builders, limit, 3, mode.pipelined)
+                seconds = time_listing(
+                    connection, builders, limit, iterations, mode.pipelined
+                )
+                results[name] = seconds * 1000
+    finally:
+        engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare product and item listing queries built per request with "
+            "cached statements, with and without server-side prepared statements "
+            "or pipelining"
+        )
+    )
+    parser.add_argument(
+        "--database-url",
+        help=(
+            "Database to run against, defaults to the configured one. Point it "
+            "at a remote host to include network round trips"
+        ),
+    )
+    parser.add_argument("--limit", type=int, default=100, help="Page size")
+    parser.add_argument(
+        "--iterations", type=int, default=500, help="Listings timed per mode"
+    )
+    args = parser.parse_args()
+
+    baseline: dict[str, float] = {}
+    for mode in MODES:
+        results = benchmark_mode(mode, args.limit, args.iterations, args.database_url)
+        baseline = baseline or results
+        for name, elapsed_ms in results.items():
+            saved_ms = baseline[name] - elapsed_ms
+            logger.info(
+                f"{name}, {mode.name}: {elapsed_ms:.3f} ms, "
+                f"{saved_ms:.3f} ms saved per request"
+            )
+
+
+if __name__ == "__main__":
+    main()
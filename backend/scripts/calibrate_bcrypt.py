@@ -0,0 +1,65 @@
+import argparse
+import logging
+import secrets
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+
+def measure_verify_seconds(rounds: int, samples: int) -> float:
+    """
+    Median time to verify a password hashed with ``rounds`` on this host.
+    """
+    password = secrets.token_urlsafe(16)
+    hashed = bcrypt.using(rounds=rounds).hash(password)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.verify(password, hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def recommend_rounds(target_ms: float, samples: int) -> int:
+    """
+    Highest cost whose verification stays within ``target_ms``.
+    """
+    recommended = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed_ms = measure_verify_seconds(rounds, samples) * 1000
+        logger.info(f"rounds={rounds}: {elapsed_ms:.1f} ms per verify")
+        if elapsed_ms > target_ms:
+            break
+        recommended = rounds
+    return recommended
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark bcrypt on this host and recommend BCRYPT_ROUNDS"
+    )
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="Target time for one password verification, in milliseconds",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=5, help="Verifications timed per cost"
+    )
+    args = parser.parse_args()
+
+    logger.info(f"Calibrating bcrypt for a {args.target_ms:g} ms target")
+    rounds = recommend_rounds(args.target_ms, args.samples)
+    logger.info(f"Recommended setting: BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
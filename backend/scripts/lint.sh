@@ -3,6 +3,6 @@
 set -e
 set -x
 
-mypy app
-ruff check app
-ruff format app --check
+mypy app scripts
+ruff check app scripts
+ruff format app scripts --check
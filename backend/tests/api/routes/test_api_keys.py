@@ -0,0 +1,129 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.api_keys import api_key_usage
+from app.core.config import settings
+from app.models import ApiKey
+from tests.utils.item import create_random_item
+
+
+def create_api_key(
+    client: TestClient, headers: dict[str, str], scopes: list[str]
+) -> dict[str, str]:
+    r = client.post(
+        f"{settings.API_V1_STR}/api-keys/",
+        headers=headers,
+        json={"name": "ERP", "scopes": scopes},
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_create_api_key(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    content = create_api_key(client, normal_user_token_headers, ["items:read"])
+    assert content["key"].startswith(f"ek_{content['prefix']}_")
+    assert content["scopes"] == ["items:read"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/api-keys/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 200
+    listed = {api_key["id"]: api_key for api_key in r.json()["data"]}
+    assert content["id"] in listed
+    assert "key" not in listed[content["id"]]
+
+
+def test_create_api_key_invalid_scope(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/api-keys/",
+        headers=normal_user_token_headers,
+        json={"name": "ERP", "scopes": ["users:write"]},
+    )
+    assert r.status_code == 422
+
+
+def test_read_items_with_api_key(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    content = create_api_key(client, superuser_token_headers, ["items:read"])
+    headers = {"X-API-Key": content["key"]}
+
+    r = client.get(f"{settings.API_V1_STR}/items/{item.id}", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["id"] == str(item.id)
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+
+
+def test_api_key_scopes_enforced(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    content = create_api_key(client, normal_user_token_headers, ["items:read"])
+    headers = {"X-API-Key": content["key"]}
+
+    r = client.get(f"{settings.API_V1_STR}/products/", headers=headers)
+    assert r.status_code == 403
+    # Routes that declare no scope don't accept API keys at all
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 401
+
+
+def test_invalid_api_key(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    content = create_api_key(client, normal_user_token_headers, ["items:read"])
+    for key in ("invalid", f"ek_{content['prefix']}_wrong", "ek_unknown_secret"):
+        r = client.get(f"{settings.API_V1_STR}/items/", headers={"X-API-Key": key})
+        assert r.status_code == 403
+
+
+def test_revoke_api_key(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    content = create_api_key(client, normal_user_token_headers, ["items:read"])
+    headers = {"X-API-Key": content["key"]}
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/api-keys/{content['id']}",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
+
+
+def test_revoke_api_key_not_owner(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    content = create_api_key(client, superuser_token_headers, ["items:read"])
+    r = client.delete(
+        f"{settings.API_V1_STR}/api-keys/{content['id']}",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 400
+
+
+def test_api_key_usage_flushed_in_batches(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    content = create_api_key(client, normal_user_token_headers, ["items:read"])
+    headers = {"X-API-Key": content["key"]}
+    for _ in range(3):
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+        assert r.status_code == 200
+
+    api_key_usage.flush(db)
+    api_key = db.get(ApiKey, content["id"])
+    assert api_key
+    db.refresh(api_key)
+    assert api_key.usage_count == 3
+    assert api_key.last_used_at is not None
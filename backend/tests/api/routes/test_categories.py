@@ -0,0 +1,185 @@
+import uuid
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models import Product
+from tests.utils.utils import random_lower_string
+
+
+def create_category(
+    client: TestClient, headers: dict[str, str], parent_id: str | None = None
+) -> dict[str, Any]:
+    r = client.post(
+        f"{settings.API_V1_STR}/categories/",
+        headers=headers,
+        json={"name": random_lower_string(), "parent_id": parent_id},
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_read_category_tree(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    root = create_category(client, superuser_token_headers)
+    child = create_category(client, superuser_token_headers, root["id"])
+    grandchild = create_category(client, superuser_token_headers, child["id"])
+
+    r = client.get(f"{settings.API_V1_STR}/categories/tree")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    (node,) = [c for c in r.json() if c["id"] == root["id"]]
+    assert node["subcategories"] == [
+        {
+            **child,
+            "subcategories": [{**grandchild, "subcategories": []}],
+        }
+    ]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/categories/tree", headers={"If-None-Match": etag}
+    )
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+
+    # Writes refresh the tree
+    r = client.patch(
+        f"{settings.API_V1_STR}/categories/{grandchild['id']}",
+        headers=superuser_token_headers,
+        json={"parent_id": root["id"]},
+    )
+    assert r.status_code == 200
+    r = client.get(
+        f"{settings.API_V1_STR}/categories/tree", headers={"If-None-Match": etag}
+    )
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    (node,) = [c for c in r.json() if c["id"] == root["id"]]
+    assert {c["id"] for c in node["subcategories"]} == {child["id"], grandchild["id"]}
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/categories/{grandchild['id']}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/categories/tree")
+    (node,) = [c for c in r.json() if c["id"] == root["id"]]
+    assert [c["id"] for c in node["subcategories"]] == [child["id"]]
+
+
+def test_read_category_subtree(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    root = create_category(client, superuser_token_headers)
+    child = create_category(client, superuser_token_headers, root["id"])
+    grandchild = create_category(client, superuser_token_headers, child["id"])
+    other_root = create_category(client, superuser_token_headers)
+    products = {}
+    for category in (root, child, grandchild, other_root):
+        product = Product(
+            name=random_lower_string(),
+            sku=random_lower_string(),
+            category_id=category["id"],
+        )
+        db.add(product)
+        db.commit()
+        products[category["id"]] = str(product.id)
+
+    def subtree_products(category: dict[str, Any]) -> set[str]:
+        # One product per page, to follow the cursor across categories
+        found: list[str] = []
+        params: dict[str, Any] = {"limit": 1}
+        while True:
+            r = client.get(
+                f"{settings.API_V1_STR}/categories/{category['id']}/products",
+                headers=superuser_token_headers,
+                params=params,
+            )
+            assert r.status_code == 200
+            content = r.json()
+            found += [p["id"] for p in content["data"]]
+            if content["next_cursor"] is None:
+                break
+            params["cursor"] = content["next_cursor"]
+        assert len(found) == len(set(found))
+        return set(found)
+
+    def ancestors(category: dict[str, Any]) -> list[str]:
+        r = client.get(f"{settings.API_V1_STR}/categories/{category['id']}/ancestors")
+        assert r.status_code == 200
+        return [c["id"] for c in r.json()]
+
+    assert subtree_products(root) == {
+        products[c["id"]] for c in (root, child, grandchild)
+    }
+    assert subtree_products(child) == {products[c["id"]] for c in (child, grandchild)}
+    assert ancestors(grandchild) == [root["id"], child["id"], grandchild["id"]]
+
+    # Moving a category moves its subtree
+    r = client.patch(
+        f"{settings.API_V1_STR}/categories/{child['id']}",
+        headers=superuser_token_headers,
+        json={"parent_id": other_root["id"]},
+    )
+    assert r.status_code == 200
+    assert subtree_products(root) == {products[root["id"]]}
+    assert subtree_products(other_root) == {
+        products[c["id"]] for c in (other_root, child, grandchild)
+    }
+    assert ancestors(grandchild) == [other_root["id"], child["id"], grandchild["id"]]
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/categories/{child['id']}",
+        headers=superuser_token_headers,
+        json={"parent_id": None},
+    )
+    assert r.status_code == 200
+    assert ancestors(grandchild) == [child["id"], grandchild["id"]]
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/categories/{child['id']}",
+        headers=superuser_token_headers,
+        json={"parent_id": grandchild["id"]},
+    )
+    assert r.status_code == 400
+
+    r = client.get(f"{settings.API_V1_STR}/categories/{uuid.uuid4()}/ancestors")
+    assert r.status_code == 404
+
+
+def test_delete_middle_category(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    root = create_category(client, superuser_token_headers)
+    middle = create_category(client, superuser_token_headers, root["id"])
+    leaf = create_category(client, superuser_token_headers, middle["id"])
+    product = Product(
+        name=random_lower_string(), sku=random_lower_string(), category_id=leaf["id"]
+    )
+    db.add(product)
+    db.commit()
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/categories/{middle['id']}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+
+    # The leaf is now a root, out of its former ancestors' subtrees
+    r = client.get(f"{settings.API_V1_STR}/categories/{leaf['id']}/ancestors")
+    assert r.status_code == 200
+    assert [c["id"] for c in r.json()] == [leaf["id"]]
+    r = client.get(
+        f"{settings.API_V1_STR}/categories/{root['id']}/products",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["data"] == []
+    r = client.get(
+        f"{settings.API_V1_STR}/categories/{leaf['id']}/products",
+        headers=superuser_token_headers,
+    )
+    assert [p["id"] for p in r.json()["data"]] == [str(product.id)]
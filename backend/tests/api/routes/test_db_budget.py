@@ -0,0 +1,71 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.api.deps import SessionDep, db_time_budget
+from app.core.budgets import DBTimeBudgetExceeded
+from app.core.metrics import registry
+from app.main import db_time_budget_exceeded_handler
+
+router = APIRouter(dependencies=[Depends(db_time_budget(1000))])
+
+
+@router.get("/timeout")
+async def read_timeout(session: SessionDep) -> Any:
+    return (await session.exec(text("SHOW statement_timeout"))).scalar_one()  # type: ignore
+
+
+@router.get("/timeout/route", dependencies=[Depends(db_time_budget(50))])
+async def read_route_timeout(session: SessionDep) -> Any:
+    return (await session.exec(text("SHOW statement_timeout"))).scalar_one()  # type: ignore
+
+
+@router.get("/slow", dependencies=[Depends(db_time_budget(50))])
+async def read_slow(session: SessionDep) -> Any:
+    await session.exec(text("SELECT pg_sleep(1)"))  # type: ignore
+
+
+@router.get("/error")
+async def read_error(session: SessionDep) -> Any:
+    await session.exec(text("SELECT 1"))  # type: ignore
+    raise OperationalError("SELECT 1", {}, Exception("server closed the connection"))
+
+
+app = FastAPI()
+app.include_router(router)
+app.add_exception_handler(DBTimeBudgetExceeded, db_time_budget_exceeded_handler)  # type: ignore
+
+
+def test_router_budget_applied() -> None:
+    with TestClient(app) as client:
+        r = client.get("/timeout")
+    assert r.status_code == 200
+    assert r.json() == "1s"
+
+
+def test_route_budget_overrides_router() -> None:
+    with TestClient(app) as client:
+        r = client.get("/timeout/route")
+    assert r.status_code == 200
+    assert r.json() == "50ms"
+
+
+def test_budget_exceeded() -> None:
+    counter = registry.counter('db_time_budget_exceeded_total{route="GET /slow"}')
+    violations = counter.value
+    with TestClient(app) as client:
+        r = client.get("/slow")
+    assert r.status_code == 504
+    assert r.json() == {"detail": "Database time budget exceeded"}
+    assert counter.value == violations + 1
+
+
+def test_other_database_errors_not_budget() -> None:
+    counter = registry.counter('db_time_budget_exceeded_total{route="GET /error"}')
+    with TestClient(app, raise_server_exceptions=False) as client:
+        r = client.get("/error")
+    assert r.status_code == 500
+    assert counter.value == 0
@@ -1,12 +1,19 @@
+from datetime import datetime
 from unittest.mock import patch
 
+import jwt
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app.api.deps import token_cache
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.db import engine
+from app.core.hashing import password_hasher
+from app.core.revocation import refresh_revocation_list
+from app.core.security import ALGORITHM, verify_password
+from app.core.throttling import login_throttle
 from app.crud import create_user
-from app.models import UserCreate
+from app.models import RevokedToken, UserCreate
 from app.utils import generate_password_reset_token
 from tests.utils.user import user_authentication_headers
 from tests.utils.utils import random_email, random_lower_string
@@ -33,6 +40,88 @@ def test_get_access_token_incorrect_password(client: TestClient) -> None:
     assert r.status_code == 400
 
 
+def test_get_access_token_hashing_queue_full(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    with (
+        patch.object(password_hasher, "max_workers", 0),
+        patch.object(password_hasher, "max_queue", 0),
+    ):
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_get_access_token_throttled_after_failures(client: TestClient) -> None:
+    login_data = {"username": random_email(), "password": random_lower_string()}
+    with (
+        patch.object(login_throttle, "max_failures_per_account", 2),
+        patch("app.crud.authenticate_async", return_value=None) as authenticate,
+    ):
+        for _ in range(2):
+            r = client.post(
+                f"{settings.API_V1_STR}/login/access-token", data=login_data
+            )
+            assert r.status_code == 400
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) > 0
+        assert authenticate.call_count == 2
+
+
+def test_get_access_token_throttled_per_forwarded_ip(client: TestClient) -> None:
+    def login(forwarded_for: str) -> int:
+        login_data = {"username": random_email(), "password": random_lower_string()}
+        r = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data=login_data,
+            headers={"X-Forwarded-For": forwarded_for},
+        )
+        return r.status_code
+
+    with (
+        patch.object(login_throttle, "max_failures_per_ip", 2),
+        patch("app.core.config.settings.FORWARDED_ALLOW_IPS", ["testclient"]),
+        patch("app.crud.authenticate_async", return_value=None),
+    ):
+        assert login("198.51.100.7") == 400
+        assert login("198.51.100.7") == 400
+        assert login("198.51.100.7") == 429
+        # Entries added by the client before the proxy's don't matter
+        assert login("192.0.2.1, 198.51.100.7") == 429
+        # Other clients behind the same proxy are unaffected
+        assert login("198.51.100.8") == 400
+
+
+def test_self_contained_access_token(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    with patch("app.core.config.settings.ACCESS_TOKEN_EMBED_CLAIMS", True):
+        headers = user_authentication_headers(
+            client=client, email=email, password=password
+        )
+    token = headers["Authorization"].removeprefix("Bearer ")
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    assert payload["act"] is True
+    assert payload["su"] is False
+    assert payload["ver"] == 0
+
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/password",
+        headers=headers,
+        json={"current_password": password, "new_password": random_lower_string()},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
+
+
 def test_use_access_token(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -45,6 +134,74 @@ def test_use_access_token(
     assert "email" in result
 
 
+def test_use_access_token_decoded_once(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    client.post(
+        f"{settings.API_V1_STR}/login/test-token", headers=superuser_token_headers
+    )
+    hits = token_cache.hits.value
+    with patch("jwt.decode") as decode:
+        r = client.post(
+            f"{settings.API_V1_STR}/login/test-token", headers=superuser_token_headers
+        )
+    assert r.status_code == 200
+    assert not decode.called
+    assert token_cache.hits.value == hits + 1
+
+
+def test_use_invalid_access_token_cached(client: TestClient) -> None:
+    headers = {"Authorization": f"Bearer {random_lower_string()}"}
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+    with patch("jwt.decode") as decode:
+        r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+    assert not decode.called
+
+
+def test_logout_revokes_access_token(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    other_headers = user_authentication_headers(
+        client=client, email=email, password=password
+    )
+
+    r = client.post(f"{settings.API_V1_STR}/logout", headers=headers)
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 403
+    # Other sessions of the same user are unaffected
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=other_headers)
+    assert r.status_code == 200
+
+
+def test_revocation_list_refresh(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    token = headers["Authorization"].partition(" ")[2]
+    payload = jwt.decode(token, options={"verify_signature": False})
+
+    # Revoked through another worker, which this one hasn't heard of yet
+    db.add(
+        RevokedToken(
+            jti=payload["jti"], expires_at=datetime.utcfromtimestamp(payload["exp"])
+        )
+    )
+    db.commit()
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    refresh_revocation_list(engine)
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 403
+
+
 def test_recovery_password(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -116,3 +273,68 @@ def test_reset_password_invalid_token(
     assert "detail" in response
     assert r.status_code == 400
     assert response["detail"] == "Invalid token"
+
+
+def test_refresh_access_token(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    refresh_token = r.json()["refresh_token"]
+    assert refresh_token
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": refresh_token},
+    )
+    assert r.status_code == 200
+    tokens = r.json()
+    assert tokens["refresh_token"] != refresh_token
+    r = client.post(
+        f"{settings.API_V1_STR}/login/test-token",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert r.status_code == 200
+
+
+def test_refresh_token_reuse_revokes_family(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    first = r.json()["refresh_token"]
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token", json={"refresh_token": first}
+    )
+    second = r.json()["refresh_token"]
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token", json={"refresh_token": first}
+    )
+    assert r.status_code == 400
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token", json={"refresh_token": second}
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid refresh token"
+
+
+def test_revoke_refresh_tokens(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    tokens = r.json()
+    r = client.post(
+        f"{settings.API_V1_STR}/login/revoke-refresh-tokens",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert r.status_code == 200
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 400
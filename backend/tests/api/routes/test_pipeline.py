@@ -0,0 +1,93 @@
+from typing import Any
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import literal, text
+from sqlmodel import Session, func, select
+
+from app.api.deps import SessionDep, db_time_budget
+from app.core.budgets import DBTimeBudgetExceeded
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.pipeline import pipelined
+from app.core.slow_queries import slow_query_log
+from app.main import db_time_budget_exceeded_handler
+from app.models import Category
+from tests.utils.utils import random_lower_string
+
+router = APIRouter(dependencies=[Depends(db_time_budget(1000))])
+
+
+@router.get("/pipelined")
+async def read_pipelined(session: SessionDep) -> Any:
+    return await pipelined(
+        session,
+        (select(literal(1).label("one")), {}),
+        (text("SHOW statement_timeout"), {}),
+        (select(literal(1).label("x")).where(text("false")), {}),
+    )
+
+
+@router.get("/pipelined/slow", dependencies=[Depends(db_time_budget(50))])
+async def read_pipelined_slow(session: SessionDep) -> Any:
+    return await pipelined(
+        session, (text("SELECT pg_sleep(1)"), {}), (select(literal(1)), {})
+    )
+
+
+app = FastAPI()
+app.include_router(router)
+app.add_exception_handler(DBTimeBudgetExceeded, db_time_budget_exceeded_handler)  # type: ignore
+
+
+def test_pipelined() -> None:
+    with TestClient(app) as client:
+        r = client.get("/pipelined")
+    assert r.status_code == 200
+    # Ran on the request's connection, in its transaction
+    assert r.json() == [[{"one": 1}], [{"statement_timeout": "1s"}], []]
+
+
+def test_pipelined_budget_exceeded() -> None:
+    counter = registry.counter(
+        'db_time_budget_exceeded_total{route="GET /pipelined/slow"}'
+    )
+    violations = counter.value
+    with TestClient(app) as client:
+        r = client.get("/pipelined/slow")
+    assert r.status_code == 504
+    assert counter.value == violations + 1
+
+
+def test_pipelined_slow_query_logged(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+    monkeypatch.setattr(slow_query_log, "sample_rate", 0)
+    with TestClient(app) as client:
+        r = client.get("/pipelined")
+    assert r.status_code == 200
+    statements = {
+        entry.statement for entry in slow_query_log.recent if entry.route is None
+    }
+    assert "SHOW statement_timeout" in statements
+
+
+def test_read_categories_pipelined_count(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    db.add(Category(name=random_lower_string()))
+    db.add(Category(name=random_lower_string()))
+    db.commit()
+    total = db.exec(select(func.count()).select_from(Category)).one()
+
+    r = client.get(
+        f"{settings.API_V1_STR}/categories/",
+        headers=superuser_token_headers,
+        params={"limit": 1},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["count"] == total
+    assert len(content["data"]) == 1
+    assert content["next_cursor"] is not None
+    assert set(content["data"][0]) >= {"id", "name"}
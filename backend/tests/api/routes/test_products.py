@@ -0,0 +1,334 @@
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.routes.product import facets_cache
+from app.core.autocomplete import ProductSuggestions, SuggestionIndex
+from app.core.config import settings
+from app.models import Category, Product
+from tests.utils.utils import random_lower_string
+
+
+def create_category_products(db: Session) -> Category:
+    category = Category(name=random_lower_string())
+    db.add(category)
+    db.commit()
+    for price, in_stock in (("30.00", True), ("10.00", False), ("20.00", True)):
+        product = Product(
+            name=random_lower_string(),
+            sku=random_lower_string(),
+            price=Decimal(price),
+            in_stock=in_stock,
+            category_id=category.id,
+        )
+        db.add(product)
+    db.commit()
+    return category
+
+
+def test_read_products_filtered_and_sorted(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    category = create_category_products(db)
+    params = {"category_id": str(category.id), "sort": "-price", "limit": 2}
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        params=params,
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert [float(p["price"]) for p in content["data"]] == [30, 20]
+    assert content["count"] == 3
+
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        params={**params, "cursor": content["next_cursor"]},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert [float(p["price"]) for p in content["data"]] == [10]
+    assert content["next_cursor"] is None
+
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        params={
+            "category_id": str(category.id),
+            "sort": "price",
+            "price_min": "15",
+            "in_stock": True,
+        },
+    )
+    assert r.status_code == 200
+    assert [float(p["price"]) for p in r.json()["data"]] == [20, 30]
+
+
+def test_read_products_facets(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    category = create_category_products(db)
+    params = {
+        "category_id": str(category.id),
+        "facets": ["category_id", "price", "in_stock"],
+        "limit": 1,
+    }
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        params=params,
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert len(content["data"]) == 1
+    assert content["facets"] == {
+        "category_id": [{"category_id": str(category.id), "count": 3}],
+        "price": [
+            {"min": "10", "max": "25", "count": 2},
+            {"min": "25", "max": "50", "count": 1},
+        ],
+        "in_stock": [{"in_stock": True, "count": 2}, {"in_stock": False, "count": 1}],
+    }
+
+    # Counted once per filter until the cache entry expires
+    hits = facets_cache.hits.value
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        params={**params, "facets": ["in_stock", "price", "category_id"]},
+    )
+    assert r.json()["facets"] == content["facets"]
+    assert facets_cache.hits.value == hits + 1
+
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        params={"category_id": str(category.id), "in_stock": False, "facets": "price"},
+    )
+    assert r.json()["facets"] == {
+        "category_id": None,
+        "price": [{"min": "10", "max": "25", "count": 1}],
+        "in_stock": None,
+    }
+
+
+def test_read_products_unindexed_query(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    for params, detail in (
+        ({"sort": "price"}, "Sorting on price requires filtering on category_id"),
+        ({"sort": "description"}, "Can't sort on description"),
+        ({"price_max": "10"}, "Filtering on price_max requires sort=price"),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/products/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert r.status_code == 400
+        assert r.json()["detail"].startswith(detail)
+
+
+def test_search_products(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    category = Category(name=random_lower_string())
+    db.add(category)
+    db.commit()
+    word = random_lower_string()[:12]
+    for name, description in (
+        (f"{word} case", f"A <b>sturdy</b> case, {word} {word}"),
+        (f"Blue {word}", None),
+        ("Lamp", f"Goes well with a {word}"),
+        ("Unrelated", "Nothing to see"),
+    ):
+        product = Product(
+            name=name,
+            description=description,
+            sku=random_lower_string(),
+            category_id=category.id,
+        )
+        db.add(product)
+    db.commit()
+
+    names = []
+    params = {"q": word, "limit": 2}
+    while True:
+        r = client.get(
+            f"{settings.API_V1_STR}/products/search",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert r.status_code == 200
+        content = r.json()
+        names += [hit["name"] for hit in content["data"]]
+        if content["next_cursor"] is None:
+            break
+        params["cursor"] = content["next_cursor"]
+    # Matches in the name weigh more than in the description
+    assert names == [f"{word} case", f"Blue {word}", "Lamp"]
+    assert content["capped"] is False
+
+    r = client.get(
+        f"{settings.API_V1_STR}/products/search",
+        headers=superuser_token_headers,
+        params={"q": f"{word} -lamp"},
+    )
+    hits = {hit["name"]: hit for hit in r.json()["data"]}
+    assert hits.keys() == {f"{word} case", f"Blue {word}"}
+    hit = hits[f"{word} case"]
+    assert hit["rank"] > 0
+    assert "<b>" not in hit["snippet"]
+    assert f"<mark>{word}</mark>" in hit["snippet"]
+
+
+def test_search_products_capped(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    category = Category(name=random_lower_string())
+    db.add(category)
+    db.commit()
+    word = random_lower_string()[:12]
+    ids = []
+    for _ in range(3):
+        product = Product(
+            name=f"{word} {random_lower_string()}",
+            sku=random_lower_string(),
+            category_id=category.id,
+        )
+        db.add(product)
+        db.commit()
+        ids.append(str(product.id))
+
+    found = []
+    params = {"q": word, "limit": 1}
+    with patch("app.core.config.settings.PRODUCT_SEARCH_MAX_CANDIDATES", 2):
+        while True:
+            r = client.get(
+                f"{settings.API_V1_STR}/products/search",
+                headers=superuser_token_headers,
+                params=params,
+            )
+            assert r.status_code == 200
+            content = r.json()
+            assert content["capped"] is True
+            found += [hit["id"] for hit in content["data"]]
+            if content["next_cursor"] is None:
+                break
+            params["cursor"] = content["next_cursor"]
+    # Always the most recently added matches, each on a single page
+    assert sorted(found) == sorted(ids[1:])
+
+
+def test_search_products_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/products/search",
+        headers=superuser_token_headers,
+        params={"q": "lamp", "cursor": "not a cursor"},
+    )
+    assert r.status_code == 400
+
+
+def test_suggest_products(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    category = Category(name=random_lower_string())
+    db.add(category)
+    db.commit()
+    word = random_lower_string()[:12]
+    r = client.post(
+        f"{settings.API_V1_STR}/products/",
+        headers=superuser_token_headers,
+        json={
+            "name": f"Red {word} Café",
+            "sku": random_lower_string(),
+            "price": "10.00",
+            "quantity": 1,
+            "category_id": str(category.id),
+        },
+    )
+    assert r.status_code == 200
+    product_id = r.json()["id"]
+
+    def suggest(q: str) -> list[str]:
+        r = client.get(
+            f"{settings.API_V1_STR}/products/suggest",
+            headers=superuser_token_headers,
+            params={"q": q},
+        )
+        assert r.status_code == 200
+        return [suggestion["id"] for suggestion in r.json()]
+
+    assert suggest(word[:4].upper()) == [product_id]
+    assert suggest(f"{word} cafe") == [product_id]
+    # One typo away
+    assert suggest(word[0] + word[2:]) == [product_id]
+
+    r = client.put(
+        f"{settings.API_V1_STR}/products/{product_id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+    assert suggest(word) == []
+
+    r = client.put(
+        f"{settings.API_V1_STR}/products/{product_id}",
+        headers=superuser_token_headers,
+        json={"is_active": True},
+    )
+    assert suggest(word) == [product_id]
+    r = client.delete(
+        f"{settings.API_V1_STR}/products/{product_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert suggest(word) == []
+
+
+def test_suggestions_refresh(db: Session) -> None:
+    suggestions = ProductSuggestions(
+        max_products=100, refresh_interval=10, rebuild_interval=3600
+    )
+    category = Category(name=random_lower_string())
+    db.add(category)
+    db.commit()
+    word = random_lower_string()[:12]
+    product = Product(name=word, sku=random_lower_string(), category_id=category.id)
+    db.add(product)
+    db.commit()
+    suggestions.refresh(db)
+    assert [s.id for s in suggestions.suggest(word, 10)] == [product.id]
+
+    # Written through another worker
+    product.name = f"Blue {word}"
+    db.add(product)
+    other = Product(
+        name=f"Green {word}", sku=random_lower_string(), category_id=category.id
+    )
+    db.add(other)
+    db.commit()
+    suggestions.refresh(db)
+    names = {s.name for s in suggestions.suggest(word, 10)}
+    assert names == {f"Blue {word}", f"Green {word}"}
+
+
+def test_suggestion_index_bounded() -> None:
+    index = SuggestionIndex(max_products=2)
+    ids = [uuid.uuid4() for _ in range(3)]
+    for i, product_id in enumerate(ids):
+        index.upsert(product_id, f"lamp {i}", f"SKU-{i}", True)
+    assert len(index) == 2
+    assert [s.id for s in index.suggest("lamp", 10)] == ids[:2]
+
+    index.remove(ids[0])
+    index.upsert(ids[2], "lamp 2", "SKU-2", True)
+    assert [s.id for s in index.suggest("sku-2", 10, typos=False)] == [ids[2]]
+    assert index.suggest("lmap", 10, typos=False) == []
+    assert len(index.suggest("lmap", 10)) == 2
@@ -0,0 +1,58 @@
+from typing import Any
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel import Session
+
+from app.api.deps import SessionDep, query_budget
+from app.core.config import settings
+from app.core.db import engine
+from app.core.query_stats import QueryBudgetExceeded
+from app.core.routing import RoutingSession
+from app.main import count_queries
+from app.models import Item
+from tests.utils.item import create_random_item
+
+app = FastAPI()
+app.middleware("http")(count_queries)
+
+
+@app.get("/repeated", dependencies=[Depends(query_budget(2))])
+async def read_repeated(session: SessionDep, times: int) -> Any:
+    for _ in range(times):
+        await session.exec(text("SELECT 1"))  # type: ignore
+
+
+def test_query_stats_headers(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    assert int(r.headers["X-DB-Query-Count"]) >= 2
+    assert float(r.headers["X-DB-Time-Ms"]) > 0
+    assert r.headers["X-DB-Duplicate-Queries"] == "0"
+
+
+def test_duplicate_queries_counted() -> None:
+    with TestClient(app) as client:
+        r = client.get("/repeated", params={"times": 2})
+    assert r.status_code == 200
+    assert r.headers["X-DB-Query-Count"] == "2"
+    assert r.headers["X-DB-Duplicate-Queries"] == "1"
+
+
+def test_query_budget_exceeded() -> None:
+    with TestClient(app) as client, pytest.raises(QueryBudgetExceeded):
+        client.get("/repeated", params={"times": 3})
+
+
+def test_lazy_load_raises(db: Session) -> None:
+    item = create_random_item(db)
+    with RoutingSession(engine) as session:
+        db_item = session.get(Item, item.id)
+        assert db_item is not None
+        with pytest.raises(InvalidRequestError):
+            _ = db_item.owner
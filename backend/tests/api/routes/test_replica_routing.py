@@ -0,0 +1,165 @@
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+
+from app.api import deps
+from app.api.deps import SessionDep, db_time_budget
+from app.api.routes.category import tree_cache
+from app.api.routes.product import facets_cache
+from app.core import pipeline, routing
+from app.core.config import settings
+from app.core.db import replica_async_engines, replica_engines
+from app.core.query_stats import record_statement
+from app.core.routing import MemoryPinStore, ReplicaPins
+
+
+@pytest.fixture()
+def replica_statements(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[list[str], None, None]:
+    """
+    Route reads to a second engine on the primary's server, a stand-in for a
+    replica, and collect the statements it runs.
+    """
+    statements: list[str] = []
+
+    def record(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement)
+
+    replica = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    async_replica = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    event.listen(replica, "before_cursor_execute", record)
+    event.listen(async_replica.sync_engine, "before_cursor_execute", record)
+
+    # Pipelined statements skip the cursor events
+    def record_pipelined(db_engine: Any, statement: str, *args: Any) -> None:
+        if db_engine in (replica, async_replica.sync_engine):
+            statements.append(statement)
+        record_statement(db_engine, statement, *args)
+
+    monkeypatch.setattr(pipeline, "record_statement", record_pipelined)
+    replica_engines.append(replica)
+    replica_async_engines.append(async_replica)
+    pins = ReplicaPins(MemoryPinStore(), ttl=60)
+    monkeypatch.setattr(routing, "replica_pins", pins)
+    monkeypatch.setattr(deps, "replica_pins", pins)
+    yield statements
+    replica_engines.remove(replica)
+    replica_async_engines.remove(async_replica)
+    replica.dispose()
+
+
+def test_reads_go_to_replica(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    replica_statements: list[str],
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    assert any("FROM item" in statement for statement in replica_statements)
+
+
+def test_writes_go_to_primary(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    replica_statements: list[str],
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo", "description": "Fighters"},
+    )
+    assert r.status_code == 200
+    assert replica_statements == []
+
+
+def test_reads_pinned_to_primary_after_write(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    superuser_token_headers: dict[str, str],
+    replica_statements: list[str],
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo", "description": "Fighters"},
+    )
+    assert r.status_code == 200
+    item_id = r.json()["id"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/items/{item_id}", headers=normal_user_token_headers
+    )
+    assert r.status_code == 200
+    assert replica_statements == []
+
+    # Other users still read from the replica
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert replica_statements
+
+
+def test_category_tree_cached_from_primary(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    replica_statements: list[str],
+) -> None:
+    tree_cache.invalidate("tree")
+    r = client.get(
+        f"{settings.API_V1_STR}/categories/tree", headers=normal_user_token_headers
+    )
+    assert r.status_code == 200
+    assert not any("FROM category" in statement for statement in replica_statements)
+
+
+def test_product_facets_cached_from_primary(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    replica_statements: list[str],
+) -> None:
+    facets_cache.clear()
+    r = client.get(
+        f"{settings.API_V1_STR}/products/",
+        headers=normal_user_token_headers,
+        params={"facets": "in_stock"},
+    )
+    assert r.status_code == 200
+    assert "facets" in r.json()
+    assert not any("GROUPING SETS" in statement for statement in replica_statements)
+    # The page itself still comes from the replica
+    assert any("FROM product" in statement for statement in replica_statements)
+
+
+budget_router = APIRouter(dependencies=[Depends(db_time_budget(1000))])
+
+
+async def read_before_budget(session: SessionDep) -> None:
+    # Begins the replica's transaction before the route's budget applies
+    await session.exec(select(1))
+
+
+@budget_router.get(
+    "/timeout",
+    dependencies=[Depends(read_before_budget), Depends(db_time_budget(50))],
+)
+async def read_replica_timeout(session: SessionDep) -> Any:
+    statement = select(func.current_setting("statement_timeout"))
+    return (await session.exec(statement)).one()
+
+
+budget_app = FastAPI()
+budget_app.include_router(budget_router)
+
+
+def test_route_budget_applies_to_replica(replica_statements: list[str]) -> None:
+    with TestClient(budget_app) as client:
+        r = client.get("/timeout")
+    assert r.status_code == 200
+    assert r.json() == "50ms"
+    assert any("current_setting" in statement for statement in replica_statements)
@@ -0,0 +1,126 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.pool import InstrumentedQueuePool
+from app.core.slow_queries import (
+    SlowQueryLog,
+    normalize_sql,
+    parameter_shape,
+    slow_query_log,
+)
+
+
+def test_read_metrics(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    metrics = r.json()
+    assert metrics["password_hash_latency_seconds"]["count"] > 0
+    assert "password_hash_queue_depth" in metrics
+
+
+def test_read_metrics_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_read_db_pool(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    for pool in ("sync", "async"):
+        assert stats[pool]["size"] == settings.POSTGRES_POOL_SIZE
+        assert stats[pool]["max_overflow"] == settings.POSTGRES_MAX_OVERFLOW
+    pool = "async" if settings.POSTGRES_ASYNC_DRIVER else "sync"
+    # Opened when logging in for this module
+    assert stats[pool]["checked_in"] + stats[pool]["checked_out"] >= 1
+    assert stats[pool]["wait_seconds"]["count"] > 0
+
+
+def test_db_pool_timeout_counted() -> None:
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    pool = engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    timeouts = pool.timeouts_counter.value
+    try:
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+    finally:
+        engine.dispose()
+    assert pool.timeouts_counter.value == timeouts + 1
+
+
+def test_read_slow_queries(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+    monkeypatch.setattr(slow_query_log, "sample_rate", 1)
+    monkeypatch.setattr(slow_query_log, "max_pending_explains", 100)
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    slow_query_log.wait()
+    monkeypatch.setattr(slow_query_log, "threshold_ms", None)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/slow-queries/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    entries = [
+        entry
+        for entry in r.json()
+        if entry["route"] == f"GET {settings.API_V1_STR}/items/"
+        and "FROM item" in entry["statement"]
+    ]
+    assert entries
+    listing = next(entry for entry in entries if "LIMIT" in entry["statement"])
+    assert listing["parameters"] == {"skip": "int", "limit": "int"}
+    assert "actual time" in listing["plan"]
+
+
+def test_slow_query_normalized() -> None:
+    statement = "SELECT *\n  FROM item\n WHERE id IN (%(id_1_1)s, %(id_1_2)s)"
+    assert normalize_sql(statement) == "SELECT * FROM item WHERE id IN (...)"
+    assert parameter_shape({"id_1_1": "a", "limit": 3}) == {
+        "id_1_1": "str",
+        "limit": "int",
+    }
+    assert parameter_shape([{"a": 1}, {"a": 2}]) == [{"a": "int"}, "x2"]
+
+
+def test_slow_query_explain() -> None:
+    log = SlowQueryLog(threshold_ms=0, sample_rate=1, explain_timeout_ms=100)
+    try:
+        log.observe(engine, "WITH t AS (SELECT 1 AS a) SELECT a FROM t", {}, 1, None)
+        log.observe(engine, "SELECT pg_sleep(%(s)s)", {"s": 1}, 1, None)
+        log.observe(engine, "UPDATE item SET title = title", {}, 1, None)
+        log.wait()
+    finally:
+        log.shutdown()
+    with_query, sleep, update = log.recent
+    assert with_query.plan is not None and "actual time" in with_query.plan
+    # Cancelled past the explain timeout, so without ANALYZE
+    assert sleep.plan is not None and "actual time" not in sleep.plan
+    assert update.plan is None
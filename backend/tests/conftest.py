@@ -7,7 +7,7 @@ from sqlmodel import Session, delete
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.models import Category, Item, Product, User
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
@@ -21,9 +21,22 @@ def db() -> Generator[Session, None, None]:
         session.execute(statement)
         statement = delete(User)
         session.execute(statement)
+        statement = delete(Product)
+        session.execute(statement)
+        statement = delete(Category)
+        session.execute(statement)
         session.commit()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def strict_queries() -> Generator[None, None, None]:
+    settings.QUERY_BUDGET_STRICT = True
+    settings.SQLALCHEMY_RAISE_ON_LAZY_LOAD = True
+    yield
+    settings.QUERY_BUDGET_STRICT = False
+    settings.SQLALCHEMY_RAISE_ON_LAZY_LOAD = False
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+
+from scripts.benchmark_routes import LoadResult, best_within_target, run_load
+
+
+def test_run_load() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        status_code = 500 if request.url.path == "/fail" else 200
+        return httpx.Response(status_code)
+
+    async def load(path: str) -> LoadResult:
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await run_load(c, path, concurrency=4, duration=0.05)
+
+    result = asyncio.run(load("/ok"))
+    assert result.requests > 0
+    assert result.errors == 0
+    assert result.p50_ms <= result.p99_ms
+
+    result = asyncio.run(load("/fail"))
+    assert result.errors == result.requests
+
+
+def test_best_within_target() -> None:
+    results = [
+        LoadResult(8, 1000, 0, 500, 10, 40),
+        LoadResult(16, 2000, 0, 900, 15, 90),
+        LoadResult(32, 2500, 0, 1100, 25, 180),
+        LoadResult(64, 2600, 3, 1000, 30, 95),
+    ]
+    best = best_within_target(results, p99_target_ms=100)
+    assert best is not None
+    assert best.concurrency == 16
+    assert best_within_target(results, p99_target_ms=10) is None
@@ -0,0 +1,15 @@
+from sqlmodel import Session, select
+
+from app.models import Product
+from scripts.benchmark_search import QUERIES, seed_catalogue, time_search
+
+
+def test_seed_catalogue_and_time_search(db: Session) -> None:
+    category_id = seed_catalogue(db, 30)
+    products = db.exec(select(Product).where(Product.category_id == category_id)).all()
+    assert len(products) == 30
+    assert all(len(p.description.split()) == 12 for p in products)  # type: ignore[union-attr]
+
+    for q in QUERIES:
+        p50_ms, p99_ms = time_search(db, q, limit=5, iterations=2)
+        assert 0 < p50_ms <= p99_ms
@@ -0,0 +1,8 @@
+from scripts.benchmark_statements import MODES, QUERIES, benchmark_mode
+
+
+def test_benchmark_mode() -> None:
+    for mode in MODES:
+        results = benchmark_mode(mode, limit=10, iterations=2)
+        assert results.keys() == QUERIES.keys()
+        assert all(elapsed_ms > 0 for elapsed_ms in results.values())
@@ -0,0 +1,16 @@
+from unittest.mock import patch
+
+from scripts.calibrate_bcrypt import logger, recommend_rounds
+
+
+def test_recommend_rounds() -> None:
+    # Each extra round doubles the cost: 1 ms at rounds=4, 256 ms at rounds=12
+    with (
+        patch(
+            "scripts.calibrate_bcrypt.measure_verify_seconds",
+            side_effect=lambda rounds, _samples: 2 ** (rounds - 4) / 1000,
+        ),
+        patch.object(logger, "info"),
+    ):
+        assert recommend_rounds(target_ms=250, samples=1) == 11
+        assert recommend_rounds(target_ms=300, samples=1) == 12